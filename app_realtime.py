@@ -1,6 +1,11 @@
-from flask import Flask, render_template, request, jsonify, url_for, redirect, flash
+from flask import Flask, render_template, request, jsonify, url_for, redirect, flash, Response, stream_with_context
 from models import db, Product, ScrapingLog
-from realtime_scraper import run_realtime_scraper, get_scraping_progress, get_scraper_instance
+from migrations import upgrade_database
+from product_search import search_products
+from run_metrics import recent_run_metrics
+from realtime_scraper import (
+    run_realtime_scraper, get_scraping_progress, get_scraper_instance, is_scraping, progress_events
+)
 import os
 import threading
 from datetime import datetime
@@ -21,7 +26,6 @@ db.init_app(app)
 
 # Global variables for real-time data
 realtime_products = []
-scraping_in_progress = False
 
 @app.route('/')
 def index():
@@ -106,13 +110,7 @@ def products():
             query = query.filter(Product.category.ilike(f'%{category}%'))
         
         if search:
-            query = query.filter(
-                db.or_(
-                    Product.name.ilike(f'%{search}%'),
-                    Product.description.ilike(f'%{search}%'),
-                    Product.material_code.ilike(f'%{search}%')
-                )
-            )
+            query = search_products(query, search, columns=('name', 'description', 'material_code'))
         
         if show_discontinued:
             query = query.filter(Product.discontinued == True)
@@ -140,6 +138,17 @@ def products():
                          filter_options=filter_options,
                          use_realtime=use_realtime)
 
+@app.route('/categories')
+def categories():
+    """Categories overview page (cached database)"""
+    categories_data = db.session.query(
+        Product.category,
+        func.count(Product.id).label('count'),
+        func.max(Product.image_url).label('sample_image')
+    ).group_by(Product.category).all()
+    
+    return render_template('categories.html', categories=categories_data)
+
 @app.route('/product/realtime')
 def product_realtime():
     """Get single product in real-time"""
@@ -173,29 +182,25 @@ def admin():
     return render_template('admin_realtime.html', 
                          cached_stats=cached_stats,
                          progress=progress,
-                         scraping_in_progress=scraping_in_progress)
+                         scraping_in_progress=is_scraping())
 
 @app.route('/admin/scrape-realtime', methods=['POST'])
 def start_realtime_scraping():
     """Start real-time scraping with progress tracking"""
-    global scraping_in_progress
-    
-    if scraping_in_progress:
+    # Progress is shared between server processes, so this sees runs
+    # started by any of them
+    if is_scraping():
         flash('Scraping already in progress', 'warning')
         return redirect(url_for('admin'))
     
     save_to_db = request.form.get('save_to_db', 'false').lower() == 'true'
     
     def run_scraping():
-        global scraping_in_progress
-        scraping_in_progress = True
         try:
             result = run_realtime_scraper(app, save_to_db)
             print(f"Real-time scraping completed: {result}")
         except Exception as e:
             print(f"Real-time scraping failed: {e}")
-        finally:
-            scraping_in_progress = False
     
     # Run scraping in background thread
     thread = threading.Thread(target=run_scraping)
@@ -212,7 +217,7 @@ def api_scraping_progress():
     
     if progress:
         return jsonify({
-            'in_progress': scraping_in_progress,
+            'in_progress': is_scraping(),
             'progress': progress
         })
     else:
@@ -221,6 +226,22 @@ def api_scraping_progress():
             'progress': None
         })
 
+@app.route('/api/scraping/progress/stream')
+def api_scraping_progress_stream():
+    """Server-Sent Events stream of progress changes (one stream per open page)"""
+    since = request.headers.get('Last-Event-ID', 0, type=int)
+    return Response(
+        stream_with_context(progress_events(since)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/admin/run-metrics')
+def api_run_metrics():
+    """Structured metrics of the last N scraping runs, oldest first"""
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    return jsonify({'runs': recent_run_metrics(limit)})
+
 @app.route('/api/products/realtime')
 def api_products_realtime():
     """API endpoint for real-time products"""
@@ -359,7 +380,7 @@ def internal_error(error):
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_database()
     
     # Run the app
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -1,5 +1,8 @@
 from flask import Flask, render_template, request, jsonify, url_for, redirect, flash
 from models import db, Product, ScrapingLog, ScrapingTimer
+from migrations import upgrade_database
+from product_search import search_products
+from suggest_index import get_suggest_index, refresh_suggest_index
 from scraper_simple import run_scraper
 from scheduler import get_scheduler
 import os
@@ -49,26 +52,25 @@ def products():
     # Build query
     query = Product.query
     
+    # Facet values come from the filter options, so they are matched exactly
+    # (an indexed lookup on each facet's index)
     if category:
-        query = query.filter(Product.category.ilike(f'%{category}%'))
-    
-    if search:
-        query = query.filter(
-            db.or_(
-                Product.name.ilike(f'%{search}%'),
-                Product.description.ilike(f'%{search}%'),
-                Product.material_code.ilike(f'%{search}%')
-            )
-        )
+        query = query.filter(Product.category == category)
     
     if surface_type:
-        query = query.filter(Product.surface_type.ilike(f'%{surface_type}%'))
+        query = query.filter(Product.surface_type == surface_type)
     
     if design_group:
-        query = query.filter(Product.design_group.ilike(f'%{design_group}%'))
+        query = query.filter(Product.design_group == design_group)
     
     if color_group:
-        query = query.filter(Product.color_group.ilike(f'%{color_group}%'))
+        query = query.filter(Product.color_group == color_group)
+    
+    # Searches are ranked by relevance, plain listings newest first
+    if search:
+        query = search_products(query, search, columns=('name', 'description', 'material_code'))
+    else:
+        query = query.order_by(Product.created_at.desc())
     
     # Pagination
     products_pagination = query.paginate(
@@ -152,19 +154,28 @@ def api_search():
     if not query:
         return jsonify({'products': []})
     
-    products = Product.query.filter(
-        db.or_(
-            Product.name.ilike(f'%{query}%'),
-            Product.description.ilike(f'%{query}%'),
-            Product.category.ilike(f'%{query}%'),
-            Product.material_code.ilike(f'%{query}%')
-        )
-    ).limit(limit).all()
+    products = search_products(Product.query, query).limit(limit).all()
     
     return jsonify({
         'products': [p.to_dict() for p in products]
     })
 
+@app.route('/api/suggest')
+def api_suggest():
+    """Search-as-you-type suggestions from the in-memory prefix index"""
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 5, type=int), 20)
+    
+    suggestions = get_suggest_index().suggest(query, limit)
+    
+    return jsonify({
+        'suggestions': [{
+            'id': product_id,
+            'name': name,
+            'thumbnail': url_for('static', filename=image_path) if image_path else image_url
+        } for product_id, name, image_path, image_url in suggestions]
+    })
+
 @app.route('/admin')
 def admin():
     """Admin dashboard"""
@@ -254,6 +265,7 @@ def clear_data():
     try:
         Product.query.delete()
         db.session.commit()
+        refresh_suggest_index()
         flash('All product data cleared successfully.', 'success')
     except Exception as e:
         flash(f'Error clearing data: {e}', 'error')
@@ -271,7 +283,7 @@ def internal_error(error):
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_database()
         
         # Initialize timer from database if exists
         timer_config = ScrapingTimer.query.first()
@@ -0,0 +1,96 @@
+"""Micro-benchmark: multi-pass vs single-pass discontinued detection
+
+Usage:
+    python benchmarks/discontinued_benchmark.py [page.html | pages_dir ...] [--repeat 5]
+
+Pages are loaded like benchmarks/parse_benchmark.py (default: HTML bodies in
+the HTTP cache) and parsed once up front, so only classification is timed.
+Both classifiers run on the same full-page trees and their verdicts are
+compared.
+"""
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parse import parse_html, parse_product_html
+from discontinued_classifier import DiscontinuedClassifier, IMAGE_PATTERNS, TEXT_PATTERNS, CLASS_PATTERNS
+from parse_benchmark import load_pages
+
+
+def legacy_is_discontinued_image(img_src):
+    if not img_src:
+        return False
+    img_src_lower = img_src.lower()
+    for pattern in IMAGE_PATTERNS:
+        if pattern.lower() in img_src_lower:
+            return True
+    return False
+
+
+def legacy_is_discontinued(soup):
+    """The previous implementation: two image loops, full text, four tree scans"""
+    for img in soup.find_all('img', class_='img-responsive'):
+        if legacy_is_discontinued_image(img.get('src', '')):
+            return True
+    for img in soup.find_all('img'):
+        if legacy_is_discontinued_image(img.get('src', '')):
+            return True
+    page_text = soup.get_text().lower()
+    for pattern in TEXT_PATTERNS:
+        if pattern in page_text:
+            return True
+    for class_name in CLASS_PATTERNS:
+        if soup.find(class_=re.compile(class_name, re.I)):
+            return True
+    return False
+
+
+def best_of(repeat, fn, soups):
+    best = float('inf')
+    verdicts = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        verdicts = [fn(soup) for soup in soups]
+        best = min(best, time.perf_counter() - started)
+    return best, verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', help='saved HTML files or directories of them')
+    parser.add_argument('--cache-dir', default=os.path.join('instance', 'http_cache'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    pages = load_pages(args.pages, args.cache_dir)
+    if not pages:
+        print("No saved pages found")
+        return 1
+
+    classifier = DiscontinuedClassifier()
+    print(f"{len(pages)} pages, best of {args.repeat}\n")
+    print(f"{'tree':<14}{'classifier':<14}{'ms/page':>10}{'speedup':>9}{'discontinued':>14}{'disagree':>10}")
+
+    for tree, parse in (('full page', parse_html), ('strained', parse_product_html)):
+        soups = [parse(markup) for _, markup in pages]
+        legacy_seconds, legacy_verdicts = best_of(args.repeat, legacy_is_discontinued, soups)
+        single_seconds, single_verdicts = best_of(args.repeat, lambda soup: bool(classifier.classify(soup)), soups)
+        disagree = sum(1 for a, b in zip(legacy_verdicts, single_verdicts) if a != b)
+
+        for name, seconds, verdicts in (('multi-pass', legacy_seconds, legacy_verdicts),
+                                        ('single-pass', single_seconds, single_verdicts)):
+            print(
+                f"{tree:<14}{name:<14}{seconds * 1000 / len(pages):>10.3f}"
+                f"{legacy_seconds / seconds:>8.1f}x{sum(verdicts):>14}{disagree:>10}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Scaling of product extraction (parse + extract) across worker processes
+
+Usage:
+    python benchmarks/extract_benchmark.py [page.html | pages_dir ...] [--workers 1 2 4] [--scale 1] [--repeat 3]
+
+Pages are loaded like benchmarks/parse_benchmark.py (default: HTML bodies in
+the HTTP cache). Every page is run through ``product_extract.extract_product``
+in-process and then in a ProcessPoolExecutor with each worker count. Pages
+per second, speedup over in-process extraction and parallel efficiency
+(speedup per process) are reported, and the pool results are checked
+against the in-process ones. ``--scale`` repeats a small corpus.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_extract import extract_product
+from parse_benchmark import load_pages
+
+
+def extract_page(page):
+    url, markup = page
+    return extract_product(markup, url)['product']
+
+
+def run_serial(pages):
+    started = time.perf_counter()
+    results = [extract_page(page) for page in pages]
+    return time.perf_counter() - started, results
+
+
+def run_pool(pages, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Start the processes before timing
+        list(executor.map(abs, range(workers)))
+        started = time.perf_counter()
+        results = list(executor.map(extract_page, pages, chunksize=max(1, len(pages) // (workers * 8))))
+        return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', help='saved HTML files or directories of them')
+    parser.add_argument('--cache-dir', default=os.path.join('instance', 'http_cache'))
+    parser.add_argument('--workers', type=int, nargs='+')
+    parser.add_argument('--scale', type=int, default=1, help='run the corpus this many times')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    pages = load_pages(args.pages, args.cache_dir) * args.scale
+    if not pages:
+        print("No saved pages found")
+        return 1
+
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    print(f"{len(pages)} pages, {cpus} CPUs, best of {args.repeat}\n")
+    print(f"{'mode':<14}{'pages/s':>10}{'ms/page':>10}{'speedup':>9}{'efficiency':>12}{'mismatches':>12}")
+
+    serial_seconds, expected = min((run_serial(pages) for _ in range(args.repeat)), key=lambda r: r[0])
+    print(f"{'in-process':<14}{len(pages) / serial_seconds:>10.1f}{serial_seconds * 1000 / len(pages):>10.2f}")
+
+    for workers in worker_counts:
+        seconds, results = min((run_pool(pages, workers) for _ in range(args.repeat)), key=lambda r: r[0])
+        speedup = serial_seconds / seconds
+        mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+        print(
+            f"{f'{workers} processes':<14}{len(pages) / seconds:>10.1f}{seconds * 1000 / len(pages):>10.2f}"
+            f"{speedup:>8.2f}x{speedup / workers:>11.0%}{mismatches:>12}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
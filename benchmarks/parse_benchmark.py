@@ -0,0 +1,96 @@
+"""Compare the product-page parse paths on saved pages
+
+Usage:
+    python benchmarks/parse_benchmark.py [page.html | pages_dir ...] [--repeat 3]
+
+Without arguments the HTML bodies stored in the HTTP cache
+(instance/http_cache) are used. For every parse path the time to parse and
+the time to run the scraper's extractors are reported per page, and the
+extracted fields are compared with the original html.parser path.
+"""
+import os
+import sys
+import time
+import glob
+import logging
+import argparse
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parse import parse_html, parse_product_html
+from http_cache import ResponseCache
+from scraper_with_discontinued import RalphWilsonScraper
+
+PARSE_PATHS = [
+    ('html.parser (full page)', lambda markup: BeautifulSoup(markup, 'html.parser')),
+    ('lxml (full page)', parse_html),
+    ('lxml + SoupStrainer', parse_product_html),
+]
+
+
+def load_pages(paths, cache_dir):
+    pages = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.htm*'))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path, 'rb') as f:
+                pages.append((file_path, f.read()))
+    if not paths and os.path.isdir(cache_dir):
+        pages = list(ResponseCache(cache_dir).iter_pages('html'))
+    return pages
+
+
+def run_path(parse, pages, scraper, repeat):
+    """Best-of-``repeat`` parse and extract seconds, plus the extracted data"""
+    best_parse = best_extract = float('inf')
+    extracted = []
+    for _ in range(repeat):
+        parse_seconds = extract_seconds = 0.0
+        extracted = []
+        for url, markup in pages:
+            started = time.perf_counter()
+            soup = parse(markup)
+            parsed = time.perf_counter()
+            extracted.append(scraper.extract_product_data(soup, url, markup=markup))
+            extract_seconds += time.perf_counter() - parsed
+            parse_seconds += parsed - started
+        best_parse = min(best_parse, parse_seconds)
+        best_extract = min(best_extract, extract_seconds)
+    return best_parse, best_extract, extracted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', help='saved HTML files or directories of them')
+    parser.add_argument('--cache-dir', default=os.path.join('instance', 'http_cache'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    pages = load_pages(args.pages, args.cache_dir)
+    if not pages:
+        print("No saved pages found")
+        return 1
+
+    scraper = RalphWilsonScraper()
+    size_kb = sum(len(markup) for _, markup in pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB, best of {args.repeat}\n")
+    print(f"{'parse path':<26}{'parse ms/page':>15}{'extract ms/page':>17}{'total ms/page':>15}{'speedup':>9}{'mismatches':>12}")
+
+    baseline_total = baseline_data = None
+    for name, parse in PARSE_PATHS:
+        parse_seconds, extract_seconds, data = run_path(parse, pages, scraper, args.repeat)
+        total = parse_seconds + extract_seconds
+        if baseline_total is None:
+            baseline_total, baseline_data = total, data
+        mismatches = sum(1 for a, b in zip(baseline_data, data) if a != b)
+        print(
+            f"{name:<26}{parse_seconds * 1000 / len(pages):>15.2f}{extract_seconds * 1000 / len(pages):>17.2f}"
+            f"{total * 1000 / len(pages):>15.2f}{baseline_total / total:>8.1f}x{mismatches:>12}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""End-to-end scraper throughput against the replay server
+
+Usage:
+    python benchmarks/replay_benchmark.py [--corpus instance/replay_corpus] [--synthetic 200]
+        [--latency 0.05] [--jitter 0.0] [--error-rate 0.0] [--workers 4] [--extract-workers N]
+        [--runs 2] [--seed 1]
+
+RalphWilsonScraper runs unchanged (sitemap discovery, tiered fetch, process
+pool extraction, images, batched writes, derivatives) against a
+replay_harness.ReplayServer serving a recorded corpus, in a temporary
+working directory with its own database, so products.db and the live site
+are never touched. ``--synthetic N`` benchmarks a generated corpus of N
+products instead of a recorded one.
+
+Every run reports pages per second, p50/p95 latency per pipeline stage and
+peak RSS of the scraper process and of its worker processes. Runs are
+incremental: the first starts from an empty database and HTTP cache, later
+ones revalidate every page against them (304s, unchanged fingerprints).
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import database_app
+from replay_harness import (
+    CORPUS_DIR, ReplayCorpus, ReplayServer, replay_render, replay_session, synthesize, working_directory
+)
+from scraper_with_discontinued import RalphWilsonScraper
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_once(app, server_url, args):
+    scraper = RalphWilsonScraper(
+        app,
+        max_workers=args.workers,
+        requests_per_second=args.rate,
+        max_requests_per_second=args.rate,
+        extract_workers=args.extract_workers,
+        incremental=True,
+        checkpoint_path=None
+    )
+    replay_session(scraper.session, server_url)
+    # The browser tier gets the recorded rendered pages, over its own session
+    # so they do not overwrite the plain responses in the HTTP cache
+    scraper.render_page = scraper.fetcher.render_fn = replay_render(replay_session(requests.Session(), server_url))
+
+    started = time.perf_counter()
+    processed = scraper.scrape_all_products()
+    seconds = time.perf_counter() - started
+    return processed, seconds, scraper.pipeline.snapshot() if scraper.pipeline else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=CORPUS_DIR)
+    parser.add_argument('--synthetic', type=int, metavar='N', help='generate a corpus of N products')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--workers', type=int, default=4, help='fetch workers')
+    parser.add_argument('--extract-workers', type=int, help='extraction processes (default: one per CPU)')
+    parser.add_argument('--rate', type=float, default=1000.0, help='requests per second allowed per host')
+    parser.add_argument('--runs', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.synthetic:
+            corpus = synthesize(os.path.join(workdir, 'corpus'), args.synthetic, seed=args.seed)
+        else:
+            corpus = ReplayCorpus(os.path.abspath(args.corpus))
+        if not len(corpus):
+            print(f"No recorded responses in {corpus.path} (run replay_harness.py record first)")
+            return 1
+
+        server = ReplayServer(corpus, args.latency, args.jitter, args.error_rate, seed=args.seed)
+        server_url = server.start()
+        print(f"{len(corpus)} responses, latency {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms, "
+              f"error rate {args.error_rate:.0%}, {args.workers} fetch workers, {os.cpu_count() or 1} CPUs")
+        try:
+            with working_directory(workdir):
+                app = database_app('benchmark.db')
+                for run in range(1, args.runs + 1):
+                    processed, seconds, snapshot = run_once(app, server_url, args)
+                    pages = snapshot[-1]['processed'] if snapshot else 0
+                    print(f"\nrun {run}: {pages} pages ({processed} changed) in {seconds:.2f}s, "
+                          f"{pages / seconds:.1f} pages/s, "
+                          f"peak RSS {peak_rss_mb(resource.RUSAGE_SELF):.0f} MB "
+                          f"(workers {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB)")
+                    print(f"  {'stage':<10}{'workers':>8}{'items':>8}{'items/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+                    for stage in snapshot:
+                        print(f"  {stage['name']:<10}{stage['workers']:>8}{stage['processed']:>8}{stage['per_second']:>10}"
+                              f"{stage['p50_ms']:>9}{stage['p95_ms']:>9}{stage['errors']:>8}")
+        finally:
+            server.stop()
+        print(f"\nserver: {server.stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import re
+import hashlib
+
+# Markup that changes between requests without the product changing
+_NOISE_BLOCK_RE = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>', re.I | re.S)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_FORM_KEY_RE = re.compile(r'<input\b[^>]*\bname=["\']?(?:form_key|csrf[\w-]*|_token)\b[^>]*>', re.I)
+_VOLATILE_ATTR_RE = re.compile(r'\s(?:nonce|data-csrf[\w-]*|data-timestamp)=("[^"]*"|\'[^\']*\')', re.I)
+_CACHE_BUSTER_RE = re.compile(r'([?&])(?:v|ver|version|_|t|ts)=[\w.-]+', re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_html(html):
+    """Strip scripts, comments, form keys and cache busters and collapse whitespace
+
+    Regex-only on purpose: the point is to decide whether a page needs a full
+    parse, so this must stay much cheaper than building a DOM.
+    """
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='ignore')
+
+    html = _NOISE_BLOCK_RE.sub('', html)
+    html = _COMMENT_RE.sub('', html)
+    html = _FORM_KEY_RE.sub('', html)
+    html = _VOLATILE_ATTR_RE.sub('', html)
+    html = _CACHE_BUSTER_RE.sub(r'\1', html)
+    return _WHITESPACE_RE.sub(' ', html).strip()
+
+
+def page_fingerprint(html):
+    """SHA-256 of the normalized page, stable across cosmetic re-renders"""
+    return hashlib.sha256(normalize_html(html).encode('utf-8')).hexdigest()
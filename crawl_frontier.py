@@ -0,0 +1,133 @@
+import heapq
+import sqlite3
+import threading
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl',
+                   'ref', 'referrer', 'source', '___sid', '___store', '___from_store', 'sid', 'phpsessid'}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """Canonical form of a URL, used as its identity in the frontier
+
+    Lowercases scheme, host and path, drops default ports, fragments,
+    tracking parameters and the trailing slash, collapses repeated slashes
+    and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = '/'.join(segment for segment in parts.path.lower().split('/') if segment)
+    path = '/' + path if path else ''
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class CrawlFrontier:
+    """Priority queue of items to fetch, each canonical URL at most once
+
+    ``add(item, priority)`` canonicalizes ``item['url']`` in place and queues
+    the item unless that URL was already added; higher priorities pop first,
+    ties pop in insertion order. With ``seen_path`` the URLs passed to
+    ``mark_done()`` are kept in a SQLite file, so a run that crashed does not
+    fetch them again while failed and still-queued URLs are retried. The file
+    only covers one run: call ``reset()`` once the run completes.
+    """
+
+    def __init__(self, seen_path=None):
+        self.seen_path = seen_path
+        self._lock = threading.Lock()
+        self._heap = []
+        self._counter = 0
+        self.seen = set()
+        self.duplicates = 0
+
+        self._conn = None
+        if seen_path:
+            self._conn = sqlite3.connect(seen_path, check_same_thread=False)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS seen_urls (url TEXT PRIMARY KEY)')
+            self.seen.update(url for url, in self._conn.execute('SELECT url FROM seen_urls'))
+
+    def add(self, item, priority=0):
+        """Queue ``item`` if its URL is new; returns True when queued"""
+        url = canonicalize_url(item['url'])
+        item['url'] = url
+        with self._lock:
+            if url in self.seen:
+                self.duplicates += 1
+                return False
+            self.seen.add(url)
+            heapq.heappush(self._heap, (-priority, self._counter, item))
+            self._counter += 1
+        return True
+
+    def mark_seen(self, url):
+        """Record ``url`` as seen without queueing it (e.g. already fetched)"""
+        with self._lock:
+            self.seen.add(canonicalize_url(url))
+
+    def mark_done(self, url):
+        """Record ``url`` as fetched and written; persisted by the next ``commit()``"""
+        url = canonicalize_url(url)
+        with self._lock:
+            self.seen.add(url)
+            if self._conn:
+                self._conn.execute('INSERT OR IGNORE INTO seen_urls VALUES (?)', (url,))
+
+    def queued(self):
+        """(item, priority) pairs still queued, in pop order"""
+        with self._lock:
+            return [(item, -negated) for negated, _, item in sorted(self._heap, key=lambda entry: entry[:2])]
+
+    def pop(self):
+        with self._lock:
+            return heapq.heappop(self._heap)[2] if self._heap else None
+
+    def __iter__(self):
+        """Pop items in priority order until the frontier is empty"""
+        while True:
+            item = self.pop()
+            if item is None:
+                return
+            yield item
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self.seen
+
+    def commit(self):
+        """Flush the URLs marked done to disk"""
+        if self._conn:
+            with self._lock:
+                self._conn.commit()
+
+    def reset(self):
+        """Forget every seen URL (persisted ones too) and drop queued items"""
+        with self._lock:
+            self.seen.clear()
+            self._heap = []
+            if self._conn:
+                self._conn.execute('DELETE FROM seen_urls')
+                self._conn.commit()
+
+    def close(self):
+        """Close the file; URLs marked done since the last ``commit()`` are dropped"""
+        if self._conn:
+            self._conn.close()
+            self._conn = None
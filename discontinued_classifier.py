@@ -0,0 +1,113 @@
+import re
+from html import unescape
+from collections import namedtuple
+from bs4 import NavigableString, CData, Tag
+
+# kind is 'image', 'text' or 'class'; pattern is the indicator that matched
+# and value the (truncated) src, text or class attribute it was found in
+Evidence = namedtuple('Evidence', ['kind', 'pattern', 'value'])
+
+IMAGE_PATTERNS = [
+    "NoImage783x323DetailView.jpg",
+    "placeholder/default/NoImage",
+    "noimage",
+    "placeholder.jpg",
+    "default-image",
+    "no-image"
+]
+
+TEXT_PATTERNS = [
+    'discontinuado',
+    'discontinued',
+    'descontinuado',
+    'no disponible',
+    'not available',
+    'producto descontinuado',
+    'fuera de stock',
+    'out of stock'
+]
+
+CLASS_PATTERNS = [
+    'discontinued',
+    'out-of-stock',
+    'unavailable',
+    'descontinuado'
+]
+
+# Only these string types count as page text (as in Tag.get_text());
+# comments, scripts and styles are skipped
+TEXT_TYPES = (NavigableString, CData)
+
+
+class DiscontinuedClassifier:
+    """Detect discontinued products in one pass over the DOM
+
+    All indicators (image URL fragments, text phrases and class names) are
+    compiled into one case-insensitive alternation, longest first. Every
+    match is looked up to see which kinds of source it counts for. The tree
+    is walked once, checking each <img> src, each class attribute and each
+    text node as it is reached.
+    """
+
+    def __init__(self, image_patterns=IMAGE_PATTERNS, text_patterns=TEXT_PATTERNS,
+                 class_patterns=CLASS_PATTERNS):
+        self.kinds = {}
+        for kind, patterns in (('image', image_patterns), ('text', text_patterns), ('class', class_patterns)):
+            for pattern in patterns:
+                self.kinds.setdefault(pattern.lower(), set()).add(kind)
+
+        alternatives = sorted(self.kinds, key=len, reverse=True)
+        self.matcher = re.compile('|'.join(re.escape(p) for p in alternatives), re.I)
+
+    def match(self, kind, value):
+        """Return the first indicator of ``kind`` found in ``value``, or None"""
+        if not value:
+            return None
+        pos = 0
+        while True:
+            found = self.matcher.search(value, pos)
+            if found is None:
+                return None
+            pattern = found.group().lower()
+            if kind in self.kinds[pattern]:
+                return pattern
+            # A longer indicator of another kind matched here; one of ours
+            # may still start inside it
+            pos = found.start() + 1
+
+    def mentions(self, markup):
+        """Whether any indicator occurs anywhere in the raw ``markup`` (str or bytes)
+
+        A cheap pre-check: when this is False, ``classify`` cannot find
+        evidence in the parsed page either.
+        """
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', 'replace')
+        if '&' in markup:
+            markup = unescape(markup)
+        return self.matcher.search(markup) is not None
+
+    def classify(self, soup, first_only=False):
+        """Return the list of Evidence found in ``soup`` (empty = not discontinued)"""
+        evidence = []
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                if node.name == 'img':
+                    src = node.get('src')
+                    pattern = self.match('image', src)
+                    if pattern:
+                        evidence.append(Evidence('image', pattern, src[:200]))
+                classes = node.get('class')
+                if classes:
+                    classes = ' '.join(classes) if isinstance(classes, list) else classes
+                    pattern = self.match('class', classes)
+                    if pattern:
+                        evidence.append(Evidence('class', pattern, classes[:200]))
+            elif type(node) in TEXT_TYPES:
+                pattern = self.match('text', node)
+                if pattern:
+                    evidence.append(Evidence('text', pattern, node.strip()[:200]))
+
+            if evidence and first_only:
+                break
+        return evidence
@@ -0,0 +1,170 @@
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """A WebDriver plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, driver, generation=0):
+        self.driver = driver
+        self.generation = generation
+        self.created_at = time.monotonic()
+        self.pages_served = 0
+        self.baseline_memory_mb = None
+
+
+class WebDriverPool:
+    """Fixed-size pool of long-lived headless browsers
+
+    Drivers are created lazily up to ``size``. A checked-out driver belongs to
+    one thread until it is released. On release a driver is recycled after
+    ``max_pages`` pages or once its JS heap grew by ``max_memory_growth_mb``.
+    Idle drivers are health-checked on checkout. Crashed drivers are discarded,
+    so the next checkout starts a replacement.
+    """
+
+    def __init__(self, driver_factory, size=4, max_pages=200,
+                 max_memory_growth_mb=300, checkout_timeout=120):
+        self.driver_factory = driver_factory
+        self.size = max(1, int(size))
+        self.max_pages = max_pages
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.checkout_timeout = checkout_timeout
+
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = deque()
+        self._all = set()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        self.stats = {'created': 0, 'recycled': 0, 'replaced': 0, 'checkouts': 0}
+
+    def checkout(self, timeout=None):
+        """Take a healthy driver out of the pool, creating one if needed"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No WebDriver available after {timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+
+                if pooled is None:
+                    pooled = self._create()
+                    break
+
+                if self._is_healthy(pooled):
+                    break
+
+                logger.warning("Idle WebDriver failed health check, replacing it")
+                self._discard(pooled)
+                self.stats['replaced'] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        self.stats['checkouts'] += 1
+        return pooled
+
+    def release(self, pooled, broken=False):
+        """Return a driver to the pool, recycling it if it is worn out"""
+        try:
+            if broken:
+                logger.warning("WebDriver crashed, discarding it")
+                self._discard(pooled)
+                self.stats['replaced'] += 1
+            elif pooled.generation != self._generation:
+                # The pool was closed while this driver was checked out
+                self._discard(pooled)
+            elif self._needs_recycling(pooled):
+                self._discard(pooled)
+                self.stats['recycled'] += 1
+            else:
+                with self._lock:
+                    self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Check out a driver for the duration of a ``with`` block"""
+        pooled = self.checkout(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            # Page timeouts also raise WebDriverException; only drop the
+            # browser when it stopped answering altogether
+            broken = not self._is_healthy(pooled)
+            raise
+        finally:
+            pooled.pages_served += 1
+            self.release(pooled, broken=broken)
+
+    def close(self):
+        """Quit every idle driver; checked-out ones are quit when released
+
+        The pool stays usable afterwards and starts fresh browsers on demand.
+        """
+        with self._lock:
+            self._generation += 1
+            idle, self._idle = list(self._idle), deque()
+            for pooled in idle:
+                self._all.discard(pooled)
+        for pooled in idle:
+            self._quit(pooled)
+
+    def _create(self):
+        pooled = PooledDriver(self.driver_factory(), self._generation)
+        pooled.baseline_memory_mb = self._memory_mb(pooled)
+        with self._lock:
+            self._all.add(pooled)
+        self.stats['created'] += 1
+        return pooled
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._all.discard(pooled)
+        self._quit(pooled)
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing WebDriver: {e}")
+
+    def _is_healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _memory_mb(self, pooled):
+        """JS heap of the current page in MB (Chrome only), or None"""
+        try:
+            used = pooled.driver.execute_script(
+                "return window.performance && performance.memory ? "
+                "performance.memory.usedJSHeapSize : null"
+            )
+            return used / (1024 * 1024) if used else None
+        except Exception:
+            return None
+
+    def _needs_recycling(self, pooled):
+        if self.max_pages and pooled.pages_served >= self.max_pages:
+            return True
+
+        if self.max_memory_growth_mb and pooled.baseline_memory_mb is not None:
+            current = self._memory_mb(pooled)
+            if current is not None and current - pooled.baseline_memory_mb > self.max_memory_growth_mb:
+                logger.info(f"Recycling WebDriver after {current - pooled.baseline_memory_mb:.0f}MB heap growth")
+                return True
+
+        return False
@@ -0,0 +1,59 @@
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is several times faster than the pure-Python 'html.parser'
+PARSER = 'lxml'
+
+# Class names of the blocks the product extractors read: header, gallery,
+# spec/detail blocks and discontinued markers
+PRODUCT_CLASS_RE = re.compile(
+    r'product|spec|detail|info|gallery|image|discontinu|descontinu|out-of-stock|unavailable',
+    re.I
+)
+
+# Page-level wrappers often carry product classes (e.g. Magento's
+# <body class="catalog-product-view">); keeping them would keep everything
+WRAPPER_TAGS = {'html', 'body', 'main', 'header', 'footer', 'nav', 'form'}
+
+
+def _is_product_part(name, attrs):
+    """SoupStrainer filter: top-level elements worth keeping from a product page
+
+    Uses the (name, attrs) callable signature of beautifulsoup4 < 4.13,
+    which is why requirements.txt pins 4.12.2.
+    """
+    if name in ('h1', 'img'):
+        return True
+    if name == 'meta':
+        return (attrs.get('name') or '').lower() == 'description'
+    if name in WRAPPER_TAGS:
+        return False
+    classes = attrs.get('class')
+    if isinstance(classes, (list, tuple)):
+        classes = ' '.join(classes)
+    return bool(classes) and PRODUCT_CLASS_RE.search(classes) is not None
+
+
+PRODUCT_STRAINER = SoupStrainer(_is_product_part)
+LINK_STRAINER = SoupStrainer('a', href=True)
+
+
+def parse_html(markup):
+    """Parse a whole document with lxml"""
+    return BeautifulSoup(markup, PARSER)
+
+
+def parse_product_html(markup):
+    """Parse only the product header, gallery, spec blocks and meta tags
+
+    Everything outside the matching subtrees (navigation, footer, scripts,
+    listing widgets) is dropped while parsing, so the tree the extractors
+    walk is a fraction of the page. Discontinued markers may be dropped
+    too; ``product_extract.extract_fields`` checks the raw markup for them.
+    """
+    return BeautifulSoup(markup, PARSER, parse_only=PRODUCT_STRAINER)
+
+
+def parse_links(markup):
+    """Parse only the <a href> elements of a listing page"""
+    return BeautifulSoup(markup, PARSER, parse_only=LINK_STRAINER)
@@ -0,0 +1,210 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Persistent, size-bounded store of GET responses keyed by URL
+
+    The index (validators, content hash, size, last access) lives in a small
+    SQLite file. Bodies are stored once per content hash, so identical
+    responses from different URLs share one file. When the cache grows past
+    ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=os.path.join('instance', 'http_cache'), max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                content_type TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)')
+        self._conn.commit()
+
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0,
+                      'bytes_saved': 0, 'bytes_downloaded': 0}
+
+    def lookup(self, url):
+        """Return the cached entry for ``url`` as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, content_hash, content_type, size FROM responses WHERE url = ?',
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        entry = dict(zip(('etag', 'last_modified', 'content_hash', 'content_type', 'size'), row))
+        if not os.path.exists(self._body_path(entry['content_hash'])):
+            return None
+        return entry
+
+    def read_body(self, entry):
+        with open(self._body_path(entry['content_hash']), 'rb') as f:
+            return f.read()
+
+    def iter_pages(self, content_type='html'):
+        """Yield (url, body) for cached responses whose Content-Type contains ``content_type``"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT url, content_hash FROM responses WHERE content_type LIKE ? ORDER BY url',
+                (f'%{content_type}%',)
+            ).fetchall()
+        for url, content_hash in rows:
+            try:
+                yield url, self.read_body({'content_hash': content_hash})
+            except OSError:
+                continue
+
+    def touch(self, url):
+        with self._lock:
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+    def store(self, url, response):
+        """Store a 200 response body and its validators; returns the content hash"""
+        body = response.content
+        content_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(content_hash)
+
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 content_hash, response.headers.get('Content-Type'), len(body), now, now)
+            )
+            self._conn.commit()
+            self.stats['stored'] += 1
+        self._evict_if_needed()
+        return content_hash
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def report(self):
+        """Hit/miss/bytes-saved counters for this run plus the current cache size"""
+        with self._lock:
+            total_size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats,
+                        hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                        cache_bytes=total_size)
+
+    def _body_path(self, content_hash):
+        return os.path.join(self.bodies_dir, content_hash)
+
+    def _evict_if_needed(self):
+        with self._lock:
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            # Evict down to 90% so we don't evict again on the very next store
+            target = self.max_bytes * 0.9
+            rows = self._conn.execute(
+                'SELECT url, content_hash, size FROM responses ORDER BY last_access'
+            ).fetchall()
+            evicted_hashes = set()
+            for url, content_hash, size in rows:
+                if total <= target:
+                    break
+                self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+                evicted_hashes.add(content_hash)
+                total -= size
+                self.stats['evicted'] += 1
+
+            for content_hash in evicted_hashes:
+                still_used = self._conn.execute(
+                    'SELECT 1 FROM responses WHERE content_hash = ? LIMIT 1', (content_hash,)
+                ).fetchone()
+                if not still_used:
+                    try:
+                        os.remove(self._body_path(content_hash))
+                    except OSError:
+                        pass
+            self._conn.commit()
+
+
+class CachedSession(requests.Session):
+    """requests.Session that revalidates GETs against a ResponseCache
+
+    Cached URLs are requested with If-None-Match / If-Modified-Since. A 304
+    is turned into a normal 200 response carrying the cached body, with
+    ``response.not_modified = True`` so callers can skip re-parsing. Every
+    response gets ``from_cache`` and ``not_modified`` attributes. Streaming
+    requests bypass the cache.
+    """
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET' or kwargs.get('stream'):
+            response = super().request(method, url, *args, **kwargs)
+            response.from_cache = False
+            response.not_modified = False
+            return response
+
+        entry = self.cache.lookup(url)
+        if entry:
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+            kwargs['headers'] = headers
+
+        response = super().request(method, url, *args, **kwargs)
+        response.from_cache = False
+        response.not_modified = False
+
+        if response.status_code == 304 and entry:
+            response.status_code = 200
+            response._content = self.cache.read_body(entry)
+            if entry['content_type']:
+                response.headers['Content-Type'] = entry['content_type']
+            response.from_cache = True
+            response.not_modified = True
+            self.cache.touch(url)
+            self.cache.count('hits')
+            self.cache.count('bytes_saved', entry['size'])
+            return response
+
+        self.cache.count('misses')
+        self.cache.count('bytes_downloaded', len(response.content))
+
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            content_hash = self.cache.store(url, response)
+            # Servers without validators still let us detect an identical body
+            if entry and entry['content_hash'] == content_hash:
+                response.not_modified = True
+
+        return response
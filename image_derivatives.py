@@ -0,0 +1,122 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = 'static'
+DERIVATIVES_DIR = 'images/derivatives'
+
+# Listing cards are ~400px wide and 200-250px tall; 2x for high-DPI screens
+THUMBNAIL_SIZE = (600, 400)
+
+
+def derivative_paths(local_image_path):
+    """Static-relative paths of the derivatives for one downloaded image
+
+    Downloads are content-addressed (``images/products/<sha[:2]>/<sha>.jpg``),
+    so derivatives are keyed by the same name and a changed image gets new
+    derivatives instead of overwriting old ones.
+    """
+    relative = local_image_path
+    if relative.startswith('images/products/'):
+        relative = relative[len('images/products/'):]
+    stem = os.path.splitext(relative)[0]
+    return {
+        'thumbnail_path': f"{DERIVATIVES_DIR}/{stem}_thumb.jpg",
+        'thumbnail_webp_path': f"{DERIVATIVES_DIR}/{stem}_thumb.webp",
+        'webp_path': f"{DERIVATIVES_DIR}/{stem}.webp",
+    }
+
+
+def make_derivatives(local_image_path, static_dir=STATIC_DIR, thumbnail_size=THUMBNAIL_SIZE, quality=80):
+    """Process-pool task: write missing derivatives of one image, return their paths
+
+    Module-level so it can be pickled. Existing files are left alone.
+    """
+    paths = derivative_paths(local_image_path)
+    targets = {key: os.path.join(static_dir, path) for key, path in paths.items()}
+    missing = [key for key, target in targets.items() if not os.path.exists(target)]
+    if not missing:
+        return paths
+
+    with Image.open(os.path.join(static_dir, local_image_path)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        for key in missing:
+            target = targets[key]
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.part"
+
+            if key == 'webp_path':
+                image.save(tmp_path, 'WEBP', quality=quality, method=4)
+            else:
+                thumb = ImageOps.fit(image, thumbnail_size, Image.LANCZOS)
+                if key == 'thumbnail_path':
+                    thumb.convert('RGB').save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+                else:
+                    thumb.save(tmp_path, 'WEBP', quality=quality, method=4)
+            os.replace(tmp_path, target)
+
+    return paths
+
+
+class DerivativeGenerator:
+    """Generate thumbnails and WebP variants for downloaded images in a process pool
+
+    Resizing and encoding are CPU-bound, so they run in worker processes
+    instead of the scraper's threads. Workers are started by a forkserver
+    (spawn where unavailable), never forked from the threaded scraper.
+    Images whose derivatives already exist are filtered out before anything
+    is submitted.
+    """
+
+    def __init__(self, static_dir=STATIC_DIR, max_workers=None, thumbnail_size=THUMBNAIL_SIZE, quality=80):
+        self.static_dir = static_dir
+        self.max_workers = max_workers
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self.stats = {'generated': 0, 'existing': 0, 'failed': 0}
+
+    def is_complete(self, local_image_path):
+        return all(
+            os.path.exists(os.path.join(self.static_dir, path))
+            for path in derivative_paths(local_image_path).values()
+        )
+
+    def generate(self, local_image_paths):
+        """Return {local_image_path: derivative paths} for every image that has them"""
+        results = {}
+        todo = []
+        for local_image_path in set(local_image_paths):
+            if not os.path.exists(os.path.join(self.static_dir, local_image_path)):
+                continue
+            if self.is_complete(local_image_path):
+                results[local_image_path] = derivative_paths(local_image_path)
+                self.stats['existing'] += 1
+            else:
+                todo.append(local_image_path)
+
+        if not todo:
+            return results
+
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(method)) as executor:
+            futures = {
+                executor.submit(make_derivatives, path, self.static_dir, self.thumbnail_size, self.quality): path
+                for path in todo
+            }
+            for future, local_image_path in futures.items():
+                try:
+                    results[local_image_path] = future.result()
+                    self.stats['generated'] += 1
+                except Exception as e:
+                    logger.error(f"Error creating derivatives for {local_image_path}: {e}")
+                    self.stats['failed'] += 1
+
+        logger.info(f"Image derivatives: {self.stats}")
+        return results
@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from rate_limiter import parse_retry_after
+from resilience import RetryableStatusError, RETRY_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePipeline:
+    """Image download stage with its own worker pool and content-addressed storage
+
+    Images are streamed to a temporary file in chunks while being hashed, then
+    atomically renamed to ``<images_dir>/<sha[:2]>/<sha><ext>``. Identical
+    images (e.g. the discontinued-product placeholder) are stored once. A
+    manifest remembers url -> path/ETag/size. An image already on disk is
+    requested conditionally and its body is never read when the server answers
+    304 or reports the same ETag or Content-Length.
+    """
+
+    def __init__(self, session, images_dir=os.path.join('static', 'images', 'products'),
+                 manifest_path=os.path.join('instance', 'image_manifest.json'),
+                 max_workers=4, rate_limiter=None, resilience=None, chunk_size=64 * 1024):
+        self.session = session
+        self.images_dir = images_dir
+        self.manifest_path = manifest_path
+        self.rate_limiter = rate_limiter
+        self.resilience = resilience
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.manifest = self._load_manifest()
+        self.stats = {'downloaded': 0, 'skipped': 0, 'deduplicated': 0, 'failed': 0, 'bytes': 0}
+
+    def submit(self, image_url):
+        """Queue a download; returns a Future resolving to the static-relative path or None"""
+        with self._lock:
+            # Several products may share one image URL; download it once
+            future = self._in_flight.get(image_url)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='image-worker')
+                future = self._executor.submit(self.download, image_url)
+                self._in_flight[image_url] = future
+            return future
+
+    def download(self, image_url):
+        """Download one image (with retries when a resilience layer is set)"""
+        try:
+            if self.resilience:
+                return self.resilience.call('image', image_url, lambda timeout: self._download_once(image_url, timeout))
+            return self._download_once(image_url, 30)
+        except Exception as e:
+            logger.error(f"Error downloading image {image_url}: {e}")
+            self._count('failed')
+            return None
+
+    def close(self):
+        """Wait for queued downloads and persist the manifest"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._in_flight = {}
+        if executor:
+            executor.shutdown(wait=True)
+        self._save_manifest()
+        logger.info(f"Image pipeline: {self.stats}")
+
+    def _download_once(self, image_url, timeout):
+        entry = self.manifest.get(image_url)
+        on_disk = entry and os.path.exists(self._abs_path(entry['path']))
+
+        headers = {}
+        if on_disk and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        if self.rate_limiter:
+            self.rate_limiter.wait(image_url)
+        response = self.session.get(image_url, headers=headers, timeout=timeout, stream=True)
+        try:
+            if on_disk and self._unchanged(response, entry):
+                self._count('skipped')
+                return entry['path']
+
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatusError(
+                    response.status_code,
+                    parse_retry_after(response.headers.get('Retry-After'))
+                )
+            response.raise_for_status()
+
+            return self._store(image_url, response)
+        finally:
+            response.close()
+
+    def _unchanged(self, response, entry):
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            return False
+        etag = response.headers.get('ETag')
+        if etag and etag == entry.get('etag'):
+            return True
+        length = response.headers.get('Content-Length')
+        return not etag and length is not None and int(length) == entry.get('size')
+
+    def _store(self, image_url, response):
+        os.makedirs(self.images_dir, exist_ok=True)
+        extension = os.path.splitext(urlparse(image_url).path)[1].lower() or '.jpg'
+        tmp_path = os.path.join(self.images_dir, f".{threading.get_ident()}.{os.getpid()}.part")
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(self.chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        rel_path = f"{content_hash[:2]}/{content_hash}{extension}"
+        final_path = self._abs_path(rel_path)
+
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            self._count('deduplicated')
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+            self._count('downloaded')
+        self._count('bytes', size)
+
+        static_path = f"images/products/{rel_path}"
+        with self._lock:
+            self.manifest[image_url] = {
+                'path': static_path,
+                'etag': response.headers.get('ETag'),
+                'size': size,
+                'sha256': content_hash
+            }
+        return static_path
+
+    def _abs_path(self, path):
+        if path.startswith('images/products/'):
+            path = path[len('images/products/'):]
+        return os.path.join(self.images_dir, path)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        with self._lock:
+            data = dict(self.manifest)
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,163 @@
+import os
+import sys
+import logging
+import argparse
+from sqlalchemy import inspect, text
+from models import Product, db
+from crawl_frontier import canonicalize_url
+from product_search import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns():
+    """Add model columns that are missing from existing tables
+
+    ``db.create_all()`` creates new tables but never alters existing ones, so
+    databases created before a column was added (e.g. instance/products.db)
+    need an ALTER TABLE for each new column. Must run inside an app context.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    ddl += f' DEFAULT {int(default) if isinstance(default, bool) else repr(default)}'
+                conn.execute(text(ddl))
+                added.append(f'{table.name}.{column.name}')
+
+    if added:
+        logger.info(f"Added missing columns: {', '.join(added)}")
+    return added
+
+
+def index_names(table_name):
+    return {index['name'] for index in inspect(db.engine).get_indexes(table_name)}
+
+
+def add_missing_indexes():
+    """Create model indexes that are missing from existing tables
+
+    Like columns, indexes declared after a table was created are not added
+    by ``db.create_all()``. Must run inside an app context.
+    """
+    existing_tables = set(inspect(db.engine).get_table_names())
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = index_names(table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                added.append(index.name)
+
+    if added:
+        logger.info(f"Added missing indexes: {', '.join(added)}")
+    return added
+
+
+def canonicalize_product_urls():
+    """Store product URLs in canonical form and detach duplicates
+
+    Prepares databases written before product_url was unique. When several
+    products share a canonical URL the most recent one keeps it; the others
+    keep their data but get a NULL product_url, so no row is deleted.
+    """
+    rows = db.session.query(Product.id, Product.product_url).filter(
+        Product.product_url.isnot(None)
+    ).order_by(Product.id.desc()).all()
+
+    owners = {}
+    changes = []
+    detached = []
+    for product_id, url in rows:
+        canonical = canonicalize_url(url)
+        if canonical in owners:
+            detached.append({'id': product_id, 'product_url': None})
+            continue
+        owners[canonical] = product_id
+        if canonical != url:
+            changes.append({'id': product_id, 'product_url': canonical})
+
+    # Detach first so a canonicalized URL never collides with an old row
+    for mappings in (detached, changes):
+        if mappings:
+            db.session.bulk_update_mappings(Product, mappings)
+            db.session.flush()
+    db.session.commit()
+
+    if detached:
+        logger.warning(f"Detached {len(detached)} duplicate products from their product_url "
+                       f"(ids: {', '.join(str(m['id']) for m in detached[:20])})")
+    if changes:
+        logger.info(f"Canonicalized {len(changes)} product URLs")
+    return len(changes), len(detached)
+
+
+def upgrade_database():
+    """Create missing tables, columns and indexes (and the full-text index) for the current models"""
+    db.create_all()
+    added = add_missing_columns()
+    if 'ux_products_product_url' not in index_names(Product.__tablename__):
+        canonicalize_product_urls()
+    added += add_missing_indexes()
+    ensure_search_index()
+    return added
+
+
+def database_uri(database):
+    """SQLAlchemy URI for a URI or a SQLite file path"""
+    return database if '://' in database else f"sqlite:///{os.path.abspath(database)}"
+
+
+def database_app(database, upgrade=True):
+    """Flask app bound to ``database`` (URI or SQLite path), upgraded to the current models
+
+    For scripts, benchmarks and throwaway runs that must not go through the
+    web app's configuration.
+    """
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(database)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    if upgrade:
+        with app.app_context():
+            upgrade_database()
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upgrade a database to the current models')
+    parser.add_argument('database', nargs='?', default=os.path.join('instance', 'products.db'),
+                        help='SQLite file or SQLAlchemy URI (default: instance/products.db)')
+    parser.add_argument('--check', action='store_true', help='then check the query plans of the routes')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = database_app(args.database)
+    print(f"{database_uri(args.database)} is up to date")
+    if args.check:
+        from query_plans import print_query_plans
+        with app.app_context():
+            return 0 if print_query_plans() else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
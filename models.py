@@ -1,10 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import json
 
 db = SQLAlchemy()
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Stable identity used by the scraper's upsert writer
+        db.Index('ux_products_product_url', 'product_url', unique=True),
+        # /products facet filters, listed newest first; the leading column
+        # also serves the DISTINCT filter options and GROUP BY category
+        db.Index('ix_products_category_created_at', 'category', 'created_at'),
+        db.Index('ix_products_surface_type_created_at', 'surface_type', 'created_at'),
+        db.Index('ix_products_design_group_created_at', 'design_group', 'created_at'),
+        db.Index('ix_products_color_group_created_at', 'color_group', 'created_at'),
+        db.Index('ix_products_discontinued_created_at', 'discontinued', 'created_at'),
+        # Unfiltered listings and recent products
+        db.Index('ix_products_created_at', 'created_at'),
+        # Existence checks by name in the simple scrapers
+        db.Index('ix_products_name', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -24,7 +40,17 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     discontinued = db.Column(db.Boolean, default=False)
-    
+
+    # Incremental scraping: normalized page hash and listing presence
+    content_fingerprint = db.Column(db.String(64))
+    last_seen_at = db.Column(db.DateTime)
+    missing_from_listing = db.Column(db.Boolean, default=False)
+
+    # Derivatives of local_image_path generated by image_derivatives
+    thumbnail_path = db.Column(db.String(500))
+    thumbnail_webp_path = db.Column(db.String(500))
+    webp_path = db.Column(db.String(500))
+
     def __repr__(self):
         return f'<Product {self.name}>'
     
@@ -37,6 +63,9 @@ class Product(db.Model):
             'description': self.description,
             'image_url': self.image_url,
             'local_image_path': self.local_image_path,
+            'thumbnail_path': self.thumbnail_path,
+            'thumbnail_webp_path': self.thumbnail_webp_path,
+            'webp_path': self.webp_path,
             'product_url': self.product_url,
             'design_group': self.design_group,
             'color_group': self.color_group,
@@ -48,21 +77,93 @@ class Product(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'discontinued': self.discontinued,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None,
+            'missing_from_listing': self.missing_from_listing,
         }
 
 class ScrapingLog(db.Model):
     __tablename__ = 'scraping_logs'
+    __table_args__ = (
+        # Latest runs on the admin pages; 'running' lookups by the scrapers
+        db.Index('ix_scraping_logs_start_time', 'start_time'),
+        db.Index('ix_scraping_logs_status', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime)
-    status = db.Column(db.String(50))  # 'running', 'completed', 'failed'
+    status = db.Column(db.String(50))  # 'running', 'completed', 'failed', 'interrupted'
+    heartbeat_at = db.Column(db.DateTime)  # refreshed while running; stale = dead process
     products_scraped = db.Column(db.Integer, default=0)
     errors = db.Column(db.Text)
+    retries = db.Column(db.Integer, default=0)
+    abandoned = db.Column(db.Integer, default=0)
+    retry_details = db.Column(db.Text)  # JSON: retried URLs and abandoned requests
     
     def __repr__(self):
         return f'<ScrapingLog {self.id} - {self.status}>'
 
+class ScrapeRunMetrics(db.Model):
+    """Structured performance metrics for one scraping run (see run_metrics.py)"""
+    __tablename__ = 'scrape_run_metrics'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('scraping_logs.id'), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(50))
+    wall_seconds = db.Column(db.Float)
+    pages = db.Column(db.Integer, default=0)  # product pages through the pipeline
+    pages_per_second = db.Column(db.Float)
+    phase_seconds = db.Column(db.Text)  # JSON: wall time of discover/pipeline/derivatives
+    stage_seconds = db.Column(db.Text)  # JSON: busy time of each pipeline stage
+    requests = db.Column(db.Integer, default=0)
+    status_counts = db.Column(db.Text)  # JSON: HTTP status code -> responses
+    bytes_downloaded = db.Column(db.Integer, default=0)
+    bytes_saved = db.Column(db.Integer, default=0)
+    cache_hits = db.Column(db.Integer, default=0)
+    cache_misses = db.Column(db.Integer, default=0)
+    parse_p50_ms = db.Column(db.Float)
+    parse_p95_ms = db.Column(db.Float)
+    write_seconds = db.Column(db.Float)
+    write_batches = db.Column(db.Integer, default=0)
+    products_new = db.Column(db.Integer, default=0)
+    products_updated = db.Column(db.Integer, default=0)
+    products_unchanged = db.Column(db.Integer, default=0)
+    products_discontinued = db.Column(db.Integer, default=0)
+    products_missing = db.Column(db.Integer, default=0)
+    
+    log = db.relationship('ScrapingLog', backref=db.backref('metrics', uselist=False))
+    
+    def __repr__(self):
+        return f'<ScrapeRunMetrics {self.log_id}>'
+    
+    def to_dict(self):
+        return {
+            'log_id': self.log_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'status': self.status,
+            'wall_seconds': self.wall_seconds,
+            'pages': self.pages,
+            'pages_per_second': self.pages_per_second,
+            'phase_seconds': json.loads(self.phase_seconds) if self.phase_seconds else {},
+            'stage_seconds': json.loads(self.stage_seconds) if self.stage_seconds else {},
+            'requests': self.requests,
+            'status_counts': json.loads(self.status_counts) if self.status_counts else {},
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_saved': self.bytes_saved,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'parse_p50_ms': self.parse_p50_ms,
+            'parse_p95_ms': self.parse_p95_ms,
+            'write_seconds': self.write_seconds,
+            'write_batches': self.write_batches,
+            'products_new': self.products_new,
+            'products_updated': self.products_updated,
+            'products_unchanged': self.products_unchanged,
+            'products_discontinued': self.products_discontinued,
+            'products_missing': self.products_missing,
+        }
+
 class ScrapingTimer(db.Model):
     __tablename__ = 'scraping_timers'
     
@@ -90,8 +191,5 @@ class ScrapingTimer(db.Model):
             'discontinued': self.discontinued,
         }
 
-# Add discontinued field to existing Product model
-# This would normally require a database migration, but we'll update the model definition
-
-# Update the Product model to include discontinued status
-# Note: In production, this would require an ALTER TABLE migration
+# Columns and indexes added to models after a database was created are
+# applied to it by migrations.upgrade_database()
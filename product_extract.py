@@ -0,0 +1,208 @@
+import os
+import re
+import multiprocessing
+import time
+import threading
+from functools import lru_cache
+from urllib.parse import urljoin
+from html_parse import parse_html, parse_product_html
+from discontinued_classifier import DiscontinuedClassifier, IMAGE_PATTERNS
+from spec_extractor import extract_specs, spec_fields
+
+# Selectors tried in order for each product field (AdaptiveSelectors may
+# reorder them by past wins)
+NAME_SELECTORS = [
+    'h1.product-title',
+    'h1.page-title',
+    '.product-name h1',
+    'h1',
+    '.product-details h1'
+]
+DESCRIPTION_SELECTORS = [
+    '.product-description',
+    '.product-details .description',
+    '.product-info p',
+    'meta[name="description"]'
+]
+IMAGE_SELECTORS = [
+    '.product-image img',
+    '.product-gallery img',
+    '.hero-image img',
+    'img[data-role="product-image"]',
+    '.main-image img',
+    'img.img-responsive'  # Specifically look for the img-responsive class
+]
+# Generic fallbacks that also match the elements of the selectors before
+# them; AdaptiveSelectors keeps them at their configured position
+FALLBACK_SELECTORS = {
+    'name': ['h1'],
+    'description': ['meta[name="description"]'],
+    'image': ['img.img-responsive']
+}
+DEFAULT_SELECTORS = {
+    'name': NAME_SELECTORS,
+    'description': DESCRIPTION_SELECTORS,
+    'image': IMAGE_SELECTORS
+}
+
+SPEC_BLOCK_RE = re.compile(r'spec|detail|info', re.I)
+
+
+def pool_context():
+    """multiprocessing context for the scraper's process pools
+
+    The scraper runs in threads that hold database connections, HTTP
+    sessions and browser handles, so workers are never forked from it:
+    they start from a clean forkserver (spawn where that is unavailable).
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def exit_with_parent(parent_pid, interval=2.0):
+    """Pool initializer: end this worker process when the scraper process dies
+
+    Worker processes otherwise outlive a crashed (killed) scraper. Workers
+    started by a forkserver are not children of the scraper, so its pid is
+    polled instead of the worker's parent pid.
+    """
+    def watch():
+        while _is_alive(parent_pid):
+            time.sleep(interval)
+        os._exit(1)
+
+    threading.Thread(target=watch, name='parent-watch', daemon=True).start()
+
+
+@lru_cache(maxsize=8)
+def get_classifier(image_patterns=tuple(IMAGE_PATTERNS)):
+    """One DiscontinuedClassifier per pattern set (and per worker process)"""
+    return DiscontinuedClassifier(image_patterns=list(image_patterns))
+
+
+def select_first(soup, selectors, accept=None):
+    """Return (element, winning selector, select_one calls) for the first match"""
+    calls = 0
+    for selector in selectors:
+        calls += 1
+        element = soup.select_one(selector)
+        if element is not None and (accept is None or accept(element)):
+            return element, selector, calls
+    return None, None, calls
+
+
+def image_source(element):
+    return element.get('src') or element.get('data-src')
+
+
+def is_complete(soup, selectors=DEFAULT_SELECTORS):
+    """Check that a page has the name, image and spec markup we extract"""
+    for field in ('name', 'image'):
+        if not any(soup.select_one(selector) is not None for selector in selectors[field]):
+            return False
+    return soup.find(['div', 'section'], class_=SPEC_BLOCK_RE) is not None
+
+
+def extract_fields(soup, url, selectors=DEFAULT_SELECTORS, image_patterns=tuple(IMAGE_PATTERNS), markup=None):
+    """Extract the product fields from a parsed product page
+
+    Returns ``(product_data, details)``; ``details`` holds the winning
+    selector and select_one calls per field plus the discontinued evidence,
+    so the caller can update selector stats and log without the extraction
+    itself touching shared state.
+
+    ``soup`` may be limited to the product blocks (``parse_product_html``).
+    Discontinued markers can sit anywhere on the page (an alert banner, an
+    unclassed section), so when ``markup`` is given they are looked for in
+    the whole page: the raw markup is scanned, and only a page that
+    mentions an indicator is parsed in full and classified.
+    """
+    classifier = get_classifier(tuple(image_patterns))
+    # Check if product is discontinued first
+    if markup is None:
+        evidence = classifier.classify(soup)
+    elif classifier.mentions(markup):
+        evidence = classifier.classify(parse_html(markup))
+    else:
+        evidence = []
+
+    product_data = {
+        'name': '',
+        'description': '',
+        'image_url': '',
+        'design_group': '',
+        'color_group': '',
+        'finish': '',
+        'dimensions': '',
+        'material_code': '',
+        'discontinued': bool(evidence)
+    }
+    details = {
+        'selectors': {},
+        'evidence': [(e.kind, e.pattern) for e in evidence],
+        'discontinued_image': None
+    }
+
+    # Extract product name
+    name_elem, selector, calls = select_first(soup, selectors['name'])
+    details['selectors']['name'] = (selector, calls)
+    if name_elem:
+        product_data['name'] = name_elem.get_text(strip=True)
+
+    # Extract description
+    desc_elem, selector, calls = select_first(soup, selectors['description'])
+    details['selectors']['description'] = (selector, calls)
+    if desc_elem:
+        if desc_elem.name == 'meta':
+            product_data['description'] = desc_elem.get('content', '')
+        else:
+            product_data['description'] = desc_elem.get_text(strip=True)
+
+    # Extract main product image (even if discontinued, we want to record the placeholder)
+    img_elem, selector, calls = select_first(soup, selectors['image'], accept=image_source)
+    details['selectors']['image'] = (selector, calls)
+    if img_elem:
+        img_src = image_source(img_elem)
+        product_data['image_url'] = urljoin(url, img_src)
+
+        # Double-check if this image indicates discontinued status
+        if not product_data['discontinued'] and classifier.match('image', img_src):
+            product_data['discontinued'] = True
+            details['discontinued_image'] = img_src
+
+    # Extract product specifications: one pass over the spec blocks
+    # builds a label -> value map, mapped onto the Product fields
+    product_data.update(spec_fields(extract_specs(soup)))
+
+    return product_data, details
+
+
+def extract_product(markup, url, selectors=DEFAULT_SELECTORS, image_patterns=tuple(IMAGE_PATTERNS)):
+    """HTML in, product dict out: the picklable unit of work for a process pool
+
+    Parses ``markup`` and extracts the product fields. The result carries
+    ``product`` (the fields), ``complete`` (whether the page had the markup
+    the scraper needs, see ``is_complete``), ``details`` (from
+    ``extract_fields``) and ``parse_seconds``.
+    """
+    started = time.perf_counter()
+    soup = parse_product_html(markup)
+    parse_seconds = time.perf_counter() - started
+
+    product_data, details = extract_fields(soup, url, selectors, image_patterns, markup=markup)
+    return {
+        'product': product_data,
+        'complete': is_complete(soup, selectors),
+        'details': details,
+        'parse_seconds': parse_seconds
+    }
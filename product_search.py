@@ -0,0 +1,149 @@
+import re
+import logging
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.exc import OperationalError
+from models import Product, db
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'products_fts'
+
+# Indexed columns and their BM25 weights (a name match outranks a description match)
+FTS_COLUMNS = {
+    'name': 10.0,
+    'material_code': 6.0,
+    'category': 4.0,
+    'description': 1.0
+}
+
+# unicode61 with remove_diacritics folds case and accents on both sides
+# ("solida" matches "Sólida"); prefix='2 3' keeps short prefix queries on
+# dedicated index entries instead of walking the whole term range.
+FTS_DDL = f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='products',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+'''
+
+_COLUMNS = ', '.join(FTS_COLUMNS)
+_NEW_VALUES = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_OLD_VALUES = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+# External-content table: the triggers keep it in sync with every write to
+# products, whether it comes from the ORM, bulk mappings or raw SQL.
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f'''
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+        END
+    ''',
+    f'{FTS_TABLE}_ad': f'''
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES});
+        END
+    ''',
+    # Only the indexed columns: incremental runs touch last_seen_at on every product
+    f'{FTS_TABLE}_au': f'''
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_COLUMNS} ON products BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES});
+            INSERT INTO {FTS_TABLE} (rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+        END
+    '''
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Whether each database (by URL) has the full-text index
+_enabled = {}
+
+
+def ensure_search_index():
+    """Create the FTS5 index and its triggers if missing; returns whether search uses it
+
+    A newly created index is filled from the existing products. Databases
+    other than SQLite, or SQLite builds without FTS5, keep the LIKE search.
+    Must run inside an app context.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        _enabled[str(engine.url)] = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first() is not None
+            conn.execute(text(FTS_DDL))
+            for ddl in FTS_TRIGGERS.values():
+                conn.execute(text(ddl))
+            if not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+                logger.info(f"Built full-text index {FTS_TABLE}")
+    except OperationalError as e:
+        logger.warning(f"Full-text search unavailable, using LIKE search: {e}")
+        _enabled[str(engine.url)] = False
+        return False
+
+    _enabled[str(engine.url)] = True
+    return True
+
+
+def search_enabled():
+    """Whether the current database has the full-text index"""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _enabled:
+        if engine.dialect.name != 'sqlite':
+            _enabled[key] = False
+        else:
+            with engine.connect() as conn:
+                _enabled[key] = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+                ).first() is not None
+    return _enabled[key]
+
+
+def match_expression(search):
+    """FTS5 MATCH expression for user text: every word must match, the last as a prefix
+
+    Words are quoted so FTS5 operators and punctuation in the input are
+    never interpreted. Returns None when the text has no searchable word.
+    """
+    words = TOKEN_RE.findall(search)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def like_filter(search, columns):
+    return db.or_(*[getattr(Product, column).ilike(f'%{search}%') for column in columns])
+
+
+def search_products(query, search, columns=tuple(FTS_COLUMNS)):
+    """Filter a Product query by ``search`` and order it by relevance (BM25)
+
+    Falls back to a substring (ILIKE) filter on ``columns`` without ranking
+    when the database has no full-text index.
+    """
+    if not search_enabled():
+        return query.filter(like_filter(search, columns))
+
+    expression = match_expression(search)
+    if expression is None:
+        return query.filter(db.false())
+
+    # Column filter: only the requested columns may match
+    if set(columns) != set(FTS_COLUMNS):
+        expression = f"{{{' '.join(columns)}}} : ({expression})"
+    weights = ', '.join(str(weight) for weight in FTS_COLUMNS.values())
+    matches = text(
+        f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expression'
+    ).bindparams(expression=expression).columns(rowid=Integer, rank=Float).subquery('fts_matches')
+    return query.join(matches, Product.id == matches.c.rowid).order_by(matches.c.rank, Product.id)
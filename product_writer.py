@@ -0,0 +1,139 @@
+import time
+import logging
+from datetime import datetime
+from sqlalchemy import func, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Product, db
+
+logger = logging.getLogger(__name__)
+
+# Columns compared to decide whether a scraped row changes the stored product
+DATA_FIELDS = ('name', 'category', 'description', 'image_url', 'design_group', 'color_group', 'finish',
+               'dimensions', 'material_code', 'surface_type', 'discontinued')
+
+# Written on update only when the new value is not NULL (filled in later stages)
+KEEP_IF_NULL = ('local_image_path', 'thumbnail_path', 'thumbnail_webp_path', 'webp_path')
+
+# Set when a row is inserted and never overwritten by the upsert
+INSERT_ONLY = ('id', 'product_url', 'created_at')
+
+# Bound parameters allowed per statement (SQLite before 3.32 allows 999)
+MAX_BIND_PARAMS = {'sqlite': 999, 'postgresql': 32767}
+
+
+class ProductWriter:
+    """Batched writer stage upserting products keyed on product_url
+
+    Existing keys and row contents are loaded once with ``preload()``. Rows
+    passed to ``add()`` are compared with what is stored: identical rows are
+    dropped, the rest are buffered and written ``batch_size`` at a time with
+    ``INSERT ... ON CONFLICT(product_url) DO UPDATE`` statements, each with
+    as many rows as fit in the database's bound-parameter limit. Image
+    paths that arrive after a row was queued are applied with the batch.
+    With ``auto_flush=False`` ``add()`` never writes: the caller calls
+    ``flush()``, e.g. to commit other state in the same transaction. Must be
+    used inside an app context, from a single thread.
+    """
+
+    def __init__(self, batch_size=100, auto_flush=True):
+        self.batch_size = batch_size
+        self.auto_flush = auto_flush
+        self.existing = {}
+        self._rows = {}
+        self._image_paths = {}
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'batches': 0, 'write_seconds': 0.0}
+
+    def preload(self):
+        """Load product_url -> stored data for every product, in one query"""
+        columns = [Product.product_url, Product.content_fingerprint] + [getattr(Product, f) for f in DATA_FIELDS]
+        self.existing = {
+            row[0]: (row[1], tuple(row[2:]))
+            for row in db.session.query(*columns).filter(Product.product_url.isnot(None))
+        }
+        return len(self.existing)
+
+    def add(self, fields):
+        """Queue one product row (a dict of Product columns including product_url)
+
+        Returns 'inserted', 'updated' or 'unchanged'.
+        """
+        url = fields['product_url']
+        data = tuple(fields.get(f) for f in DATA_FIELDS)
+        stored = self.existing.get(url)
+
+        if stored is None:
+            outcome = 'inserted'
+        elif stored[1] == data:
+            outcome = 'unchanged'
+            # Same data; only a new fingerprint (or nothing) needs storing
+            if stored[0] == fields.get('content_fingerprint'):
+                self.stats['unchanged'] += 1
+                return outcome
+        else:
+            outcome = 'updated'
+
+        self.stats[outcome] += 1
+        self.existing[url] = (fields.get('content_fingerprint'), data)
+        self._rows[url] = dict(fields)
+        if self.auto_flush and len(self._rows) >= self.batch_size:
+            self.flush()
+        return outcome
+
+    def set_image_path(self, product_url, local_image_path):
+        """Record a downloaded image for a product queued now or earlier"""
+        row = self._rows.get(product_url)
+        if row is not None:
+            row['local_image_path'] = local_image_path
+        else:
+            self._image_paths[product_url] = local_image_path
+
+    def flush(self):
+        """Write buffered rows and image paths, then commit"""
+        if not self._rows and not self._image_paths:
+            return
+        started = time.perf_counter()
+
+        if self._rows:
+            now = datetime.utcnow()
+            rows = [dict(row, created_at=now, updated_at=now) for row in self._rows.values()]
+            # A multi-row VALUES clause needs the same columns in every row
+            keys = set().union(*rows)
+            rows = [{key: row.get(key) for key in keys} for row in rows]
+
+            # SQLite and PostgreSQL share the ON CONFLICT syntax
+            dialect = db.engine.dialect.name
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            per_statement = max(1, MAX_BIND_PARAMS.get(dialect, MAX_BIND_PARAMS['sqlite']) // len(keys))
+            table = Product.__table__
+            for i in range(0, len(rows), per_statement):
+                stmt = insert(table).values(rows[i:i + per_statement])
+                set_ = {}
+                for key in keys - set(INSERT_ONLY):
+                    if key in KEEP_IF_NULL:
+                        set_[key] = func.coalesce(stmt.excluded[key], table.c[key])
+                    else:
+                        set_[key] = stmt.excluded[key]
+                db.session.execute(stmt.on_conflict_do_update(index_elements=['product_url'], set_=set_))
+
+        if self._image_paths:
+            db.session.execute(
+                update(Product.__table__).where(Product.__table__.c.product_url == bindparam('url'))
+                .values(local_image_path=bindparam('path')),
+                [{'url': url, 'path': path} for url, path in self._image_paths.items()]
+            )
+
+        db.session.commit()
+        self.stats['batches'] += 1
+        self.stats['write_seconds'] += time.perf_counter() - started
+        self._rows = {}
+        self._image_paths = {}
+
+    def report(self):
+        """Rows inserted/updated/unchanged, batches and write throughput"""
+        written = self.stats['inserted'] + self.stats['updated']
+        seconds = self.stats['write_seconds']
+        return dict(
+            self.stats,
+            write_seconds=round(seconds, 3),
+            rows_per_second=round(written / seconds, 1) if seconds else 0.0
+        )
@@ -0,0 +1,151 @@
+"""EXPLAIN QUERY PLAN for the queries behind each route
+
+Usage:
+    python query_plans.py [database]        (default: instance/products.db)
+    python migrations.py [database] --check
+
+The queries the routes and scrapers run against products and scraping_logs
+are rebuilt here and explained by SQLite. A query that scans a whole table
+without an index, or sorts/groups through a temporary B-tree, is reported as
+a problem unless it is listed as an expected scan.
+"""
+import os
+import re
+import sys
+import logging
+from sqlalchemy import func, distinct, text
+from models import Product, ScrapingLog, db
+from product_search import search_enabled, search_products
+
+logger = logging.getLogger(__name__)
+
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+TEMP_BTREE_RE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+
+SUBSTRING_SEARCH = 'substring search (LIKE %...%) cannot use a B-tree index'
+RANKED_SEARCH = 'full-text matches are sorted by BM25 rank'
+
+
+def sample_values():
+    """Real facet values from the database (placeholders for empty columns)"""
+    samples = {}
+    for column in ('category', 'surface_type', 'design_group', 'color_group', 'name', 'product_url'):
+        value = db.session.query(getattr(Product, column)).filter(getattr(Product, column).isnot(None)).limit(1).scalar()
+        samples[column] = value or f'sample-{column}'
+    return samples
+
+
+def route_queries(samples):
+    """(route, label, query, expected scan reason or None) for every checked query"""
+    products = Product.query
+    newest = Product.created_at.desc()
+    search_reason = RANKED_SEARCH if search_enabled() else SUBSTRING_SEARCH
+    queries = [
+        ('/', 'product count', db.session.query(func.count(Product.id)), None),
+        ('/', 'products per category', db.session.query(Product.category, func.count(Product.id)).group_by(Product.category), None),
+        ('/', 'recent products', products.order_by(newest).limit(8), None),
+        ('/products', 'unfiltered page', products.order_by(newest).limit(12), None),
+    ]
+    for facet in ('category', 'surface_type', 'design_group', 'color_group'):
+        column = getattr(Product, facet)
+        filtered = products.filter(column == samples[facet])
+        queries += [
+            ('/products', f'{facet} page', filtered.order_by(newest).limit(12), None),
+            ('/products', f'{facet} count', filtered.with_entities(func.count()), None),
+            ('/products', f'{facet} options', db.session.query(distinct(column)).filter(column.isnot(None)), None),
+        ]
+    queries += [
+        ('/products', 'category + surface_type page',
+         products.filter(Product.category == samples['category'], Product.surface_type == samples['surface_type'])
+         .order_by(newest).limit(12), None),
+        ('/products', 'search page',
+         search_products(products, 'sol', columns=('name', 'description', 'material_code')).limit(12), search_reason),
+        ('/product/<id>', 'product', products.filter(Product.id == 1), None),
+        ('/product/<id>', 'related products',
+         products.filter(Product.category == samples['category'], Product.id != 1).limit(4), None),
+        ('/categories', 'categories with sample image',
+         db.session.query(Product.category, func.count(Product.id), func.max(Product.image_url)).group_by(Product.category), None),
+        ('/api/products', 'page', products.limit(10), 'an unfiltered page reads only its rows'),
+        ('/api/search', 'search', search_products(products, 'sol').limit(10), search_reason),
+        ('/admin', 'discontinued count', products.filter(Product.discontinued == True).with_entities(func.count()), None),
+        ('/admin', 'category count', db.session.query(func.count(distinct(Product.category))), None),
+        ('/admin', 'recent logs', ScrapingLog.query.order_by(ScrapingLog.start_time.desc()).limit(5), None),
+        ('/products/discontinued', 'page', products.filter_by(discontinued=True).limit(12), None),
+        ('/api/products/stats', 'active count', products.filter_by(discontinued=False).with_entities(func.count()), None),
+        ('/api/products/stats', 'per category',
+         db.session.query(Product.category, func.count(Product.id),
+                          func.sum(db.case((Product.discontinued == True, 1), else_=0))).group_by(Product.category), None),
+        ('scraper', 'product by name', products.filter_by(name=samples['name']).limit(1), None),
+        ('scraper', 'product by url', products.filter_by(product_url=samples['product_url']), None),
+        ('scraper', 'running logs', ScrapingLog.query.filter_by(status='running'), None),
+    ]
+    return queries
+
+
+def explain(query):
+    """SQLite's query plan for a SQLAlchemy query, one detail line per step"""
+    sql = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+def plan_problems(plan):
+    problems = []
+    for line in plan:
+        scan = FULL_SCAN_RE.match(line)
+        if scan:
+            problems.append(f'full scan of {scan.group(1)}')
+        sort = TEMP_BTREE_RE.search(line)
+        if sort:
+            problems.append(f'temporary B-tree for {sort.group(1)}')
+    return problems
+
+
+def check_query_plans():
+    """Explain every route query; returns a list of result dicts
+
+    Must run inside an app context on a SQLite database.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError('EXPLAIN QUERY PLAN checks need a SQLite database')
+    results = []
+    for route, label, query, expected in route_queries(sample_values()):
+        plan = explain(query)
+        problems = plan_problems(plan)
+        results.append({
+            'route': route,
+            'query': label,
+            'plan': plan,
+            'problems': problems,
+            'expected': expected if problems else None,
+            'ok': not problems or expected is not None
+        })
+    return results
+
+
+def print_query_plans():
+    """Print each route query's plan; returns True when none has an unexpected problem"""
+    results = check_query_plans()
+    for result in results:
+        status = 'ok' if not result['problems'] else ('expected' if result['ok'] else 'PROBLEM')
+        print(f"[{status}] {result['route']} {result['query']}")
+        for line in result['plan']:
+            print(f"    {line}")
+        if result['problems']:
+            print(f"    -> {', '.join(result['problems'])}" + (f" ({result['expected']})" if result['expected'] else ''))
+    failed = [r for r in results if not r['ok']]
+    print(f"\n{len(results) - len(failed)}/{len(results)} queries use indexes as expected")
+    return not failed
+
+
+def main():
+    from migrations import database_app
+
+    database = sys.argv[1] if len(sys.argv) > 1 else os.path.join('instance', 'products.db')
+    logging.basicConfig(level=logging.WARNING)
+    # Reports on the schema as it is; python migrations.py upgrades it
+    with database_app(database, upgrade=False).app_context():
+        return 0 if print_query_plans() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
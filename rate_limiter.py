@@ -0,0 +1,140 @@
+import time
+import threading
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+    """Token bucket plus adaptation state for one host"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency_ewma = None
+        self.requests = 0
+        self.throttled = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+class AdaptiveRateLimiter:
+    """Per-host token bucket whose rate adapts AIMD-style
+
+    Every fetch path calls ``wait(url)`` before a request and ``record(...)``
+    after it. The rate grows additively while responses are fast and healthy
+    (``increase_step`` requests/s per second of traffic). It is cut
+    multiplicatively on 429/5xx/errors, and more gently when latency drifts
+    above ``target_latency``. A Retry-After header blocks the host for the
+    advertised time.
+    """
+
+    def __init__(self, initial_rate=4.0, min_rate=0.2, max_rate=10.0, burst=2,
+                 increase_step=0.5, decrease_factor=0.5, slow_factor=0.9,
+                 target_latency=2.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.slow_factor = slow_factor
+        self.target_latency = target_latency
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def wait(self, url=None):
+        """Block until the host of ``url`` has a token for one more request"""
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            state.refill(now)
+            state.requests += 1
+
+            # Tokens may go negative: each waiter reserves its own future slot
+            state.tokens -= 1
+            delay = max(state.blocked_until - now, -state.tokens / state.rate, 0.0)
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, url, status_code=None, latency=None, retry_after=None):
+        """Adapt the host's rate to one observed response (status None = error)"""
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+
+            if latency is not None:
+                state.latency_ewma = latency if state.latency_ewma is None else 0.8 * state.latency_ewma + 0.2 * latency
+
+            if status_code is None or status_code == 429 or status_code >= 500:
+                state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+                state.throttled += 1
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+                logger.info(f"Backing off {host} to {state.rate:.2f} req/s (status {status_code})")
+            elif state.latency_ewma is not None and state.latency_ewma > self.target_latency:
+                state.rate = max(self.min_rate, state.rate * self.slow_factor)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase_step / state.rate)
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook feeding every session response into ``record``"""
+        self.record(
+            response.url,
+            response.status_code,
+            response.elapsed.total_seconds(),
+            parse_retry_after(response.headers.get('Retry-After'))
+        )
+        return response
+
+    def current_rates(self):
+        with self._lock:
+            return {host: round(state.rate, 2) for host, state in self._hosts.items()}
+
+    def report(self):
+        """Current rate, request and throttle counts and latency per host"""
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(state.rate, 2),
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                    'latency_ewma': round(state.latency_ewma, 3) if state.latency_ewma is not None else None,
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower() if url else ''
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.initial_rate, self.burst)
+        return state
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from migrations import database_app
+from scraper_with_discontinued import RalphWilsonScraper
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PATH = os.path.join('instance', 'scraping_progress.db')
+
+# A 'running' state not updated for this long belongs to a dead process
+STALE_AFTER = 600
+
+IDLE_PROGRESS = {
+    'status': 'idle',  # 'idle', 'running', 'completed', 'failed'
+    'current_step': None,
+    'total_products': 0,
+    'processed_products': 0,
+    'discontinued_products': 0,
+    'progress_percentage': 0.0,
+    'estimated_time_remaining': None,
+    'current_product': None,
+    'started_at': None,
+    'finished_at': None,
+    'updated_at': None,
+    'result': None,
+    'error': None
+}
+
+
+class ProgressStore:
+    """Scraping progress in a SQLite table, shared by threads and server processes
+
+    Each field is one row holding its JSON value and the version at which it
+    last changed. Writers bump a single version counter per update, so
+    readers get everything that changed since the version they last saw with
+    one indexed query, whichever process wrote it.
+    """
+
+    def __init__(self, path=PROGRESS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS progress (
+                field TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_progress_version ON progress (version);
+        ''')
+
+    def _stored(self):
+        return dict(self._conn.execute('SELECT field, value FROM progress'))
+
+    def _write(self, fields):
+        """Write the fields that differ from the stored ones (inside a transaction)"""
+        stored = self._stored()
+        changed = [(field, json.dumps(value)) for field, value in fields.items()]
+        changed = [(field, value) for field, value in changed if stored.get(field) != value]
+        if not changed:
+            return None
+        version = self._conn.execute('SELECT COALESCE(MAX(version), 0) + 1 FROM progress').fetchone()[0]
+        self._conn.executemany(
+            'INSERT INTO progress (field, value, version) VALUES (?, ?, ?) '
+            'ON CONFLICT(field) DO UPDATE SET value = excluded.value, version = excluded.version',
+            [(field, value, version) for field, value in changed]
+        )
+        return version
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE serializes writers across processes
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn()
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def update(self, **fields):
+        """Store the fields whose value changed; returns the new version (or None)"""
+        return self._transaction(lambda: self._write(fields))
+
+    def changes(self, since=0):
+        """(fields changed after version ``since``, current version)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT field, value, version FROM progress WHERE version > ?', (since,)
+            ).fetchall()
+            if not rows:
+                return {}, self._conn.execute('SELECT COALESCE(MAX(version), 0) FROM progress').fetchone()[0]
+        return {field: json.loads(value) for field, value, _ in rows}, max(row[2] for row in rows)
+
+    def read(self):
+        """The full progress state"""
+        return dict(IDLE_PROGRESS, **self.changes(0)[0])
+
+    def claim(self, stale_after=STALE_AFTER):
+        """Atomically reset the state for a new run; False if a live run holds the store"""
+        def claim_once():
+            state = dict(IDLE_PROGRESS, **{field: json.loads(value) for field, value in self._stored().items()})
+            if is_running(state, stale_after):
+                return False
+            now = datetime.utcnow().isoformat()
+            self._write(dict(IDLE_PROGRESS, status='running', current_step='Iniciando...',
+                             started_at=now, updated_at=now))
+            return True
+        return self._transaction(claim_once)
+
+    def close(self):
+        self._conn.close()
+
+
+def is_running(state, stale_after=STALE_AFTER):
+    """Whether ``state`` is a run still being updated by a live process"""
+    if state.get('status') != 'running':
+        return False
+    updated_at = state.get('updated_at') or state.get('started_at')
+    if not updated_at:
+        return False
+    return (datetime.utcnow() - datetime.fromisoformat(updated_at)).total_seconds() < stale_after
+
+
+class ScrapeProgress:
+    """Progress reporter handed to RalphWilsonScraper (``progress=``)
+
+    Per-product updates are written at most every ``min_interval`` seconds;
+    steps, totals and the final state are written immediately.
+    """
+
+    def __init__(self, store, min_interval=0.25):
+        self.store = store
+        self.min_interval = min_interval
+        self.started = time.monotonic()
+        self._last_write = 0.0
+        self.total = 0
+        self.processed = 0
+        self.discontinued = 0
+        self.result = None
+
+    def _write(self, **fields):
+        fields['updated_at'] = datetime.utcnow().isoformat()
+        self._last_write = time.monotonic()
+        try:
+            self.store.update(**fields)
+        except Exception as e:
+            # Progress is informational; never fail the run over it
+            logger.error(f"Error updating scraping progress: {e}")
+
+    def step(self, name):
+        self._write(current_step=name)
+
+    def set_total(self, total, processed=0):
+        self.total = total
+        self.processed = processed
+        self._write(total_products=total, processed_products=processed,
+                    progress_percentage=self.percentage(), current_step='Procesando productos')
+
+    def item(self, name, discontinued=False):
+        self.processed += 1
+        if discontinued:
+            self.discontinued += 1
+        if time.monotonic() - self._last_write < self.min_interval and self.processed < self.total:
+            return
+        self._write(
+            processed_products=self.processed,
+            discontinued_products=self.discontinued,
+            progress_percentage=self.percentage(),
+            estimated_time_remaining=self.eta(),
+            current_product=name
+        )
+
+    def finish(self, status, result=None, error=None):
+        self.result = result
+        fields = dict(status=status, result=result, error=error, estimated_time_remaining=None,
+                      current_product=None, finished_at=datetime.utcnow().isoformat(),
+                      processed_products=self.processed, discontinued_products=self.discontinued)
+        if status == 'completed':
+            fields.update(progress_percentage=100.0, current_step='Completado')
+        else:
+            fields.update(current_step='Error')
+        self._write(**fields)
+
+    def percentage(self):
+        return round(min(100.0, self.processed * 100.0 / self.total), 1) if self.total else 0.0
+
+    def eta(self):
+        """Seconds left at the average pace so far"""
+        if not self.processed or self.processed >= self.total:
+            return None
+        elapsed = time.monotonic() - self.started
+        return round(elapsed / self.processed * (self.total - self.processed), 1)
+
+
+class RealtimeScraper(RalphWilsonScraper):
+    """RalphWilsonScraper with single-product lookups for the realtime app"""
+
+    def scrape_product_realtime(self, product_url):
+        """Fetch and extract one product page now; None on failure"""
+        product_data = self.scrape_product_page(product_url)
+        if not product_data:
+            return None
+        return dict(product_data, product_url=product_url, source='realtime',
+                    last_updated=datetime.now().isoformat())
+
+
+_store = None
+_scraper = None
+_instance_lock = threading.Lock()
+
+
+def get_progress_store():
+    """The process-wide ProgressStore"""
+    global _store
+    with _instance_lock:
+        if _store is None:
+            _store = ProgressStore()
+        return _store
+
+
+def get_scraper_instance(app):
+    """The process-wide RealtimeScraper used for single-product lookups"""
+    global _scraper
+    with _instance_lock:
+        if _scraper is None:
+            # One page at a time: extract in the request thread, not a process pool
+            _scraper = RealtimeScraper(app, checkpoint_path=None, extract_workers=0)
+        return _scraper
+
+
+def get_scraping_progress():
+    """Current progress (any process's run), or None when nothing has run yet"""
+    state = get_progress_store().read()
+    if state['status'] == 'idle':
+        return None
+    if state['status'] == 'running' and not is_running(state):
+        state['status'] = 'failed'
+        state['error'] = 'El proceso de scraping dejó de responder'
+    return state
+
+
+def is_scraping():
+    """Whether a realtime run is in progress in any process"""
+    return is_running(get_progress_store().read())
+
+
+def progress_events(since=0, poll_interval=0.5, keepalive=15.0, max_seconds=300.0):
+    """Server-Sent Events with the progress fields changed after version ``since``
+
+    The first event after connecting without a Last-Event-ID carries the
+    whole state, later ones only the changed fields. The event id is the
+    version, so a reconnecting EventSource resumes where it stopped. The
+    stream ends after ``max_seconds`` (the browser reconnects) so idle tabs
+    do not hold a server thread forever.
+    """
+    store = get_progress_store()
+    started = last_sent = time.monotonic()
+    full = since == 0
+    yield f"retry: {int(poll_interval * 4000)}\n\n"
+    while time.monotonic() - started < max_seconds:
+        changed, version = store.changes(since)
+        if version < since:
+            # The store was reset; start over with the full state
+            since, full = 0, True
+            continue
+        if changed or full:
+            state = dict(IDLE_PROGRESS, **changed) if full else changed
+            since, full = version, False
+            last_sent = time.monotonic()
+            yield f"id: {version}\ndata: {json.dumps(state)}\n\n"
+        elif time.monotonic() - last_sent >= keepalive:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        time.sleep(poll_interval)
+
+
+def run_realtime_scraper(app, save_to_db=False, max_workers=4):
+    """Scrape the site while publishing progress; returns a result summary
+
+    With ``save_to_db`` products are upserted into ``app``'s database
+    (incremental run); otherwise the run uses a throwaway database. Returns
+    None without scraping when another run, in any process, is in progress.
+    """
+    store = get_progress_store()
+    if not store.claim():
+        logger.warning("A realtime scraping run is already in progress")
+        return None
+    progress = ScrapeProgress(store)
+
+    try:
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            if save_to_db:
+                target_app = app
+                checkpoint_path = os.path.join('instance', 'realtime_checkpoint.db')
+            else:
+                target_app = database_app(os.path.join(scratch_dir, 'realtime.db'))
+                checkpoint_path = None
+            scraper = RealtimeScraper(
+                target_app,
+                max_workers=max_workers,
+                incremental=True,
+                checkpoint_path=checkpoint_path,
+                progress=progress
+            )
+            # The scraper reports the final state (completed or failed)
+            scraper.scrape_all_products()
+            return dict(progress.result or {}, saved_to_db=save_to_db)
+    except Exception as e:
+        logger.error(f"Realtime scraping failed: {e}")
+        progress.finish('failed', error=str(e))
+        raise
@@ -0,0 +1,416 @@
+"""Record scraper traffic to a local corpus and replay it from a stand-in server
+
+Record once against the live site (every HTTP response plus the pages the
+browser tier rendered), then replay as often as needed with configurable
+latency and error rates:
+
+    python replay_harness.py record --corpus instance/replay_corpus --limit 200
+    python replay_harness.py serve --corpus instance/replay_corpus --latency 0.05 --error-rate 0.02
+    python replay_harness.py synthesize --corpus /tmp/corpus --products 500
+
+``benchmarks/replay_benchmark.py`` runs RalphWilsonScraper against the
+stand-in server and reports throughput, per-stage latency and peak RSS.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.path.join('instance', 'replay_corpus')
+BASE_URL = 'https://www.ralphwilson.com.mx'
+
+# Set by ReplayAdapter: the URL the scraper asked for, and whether it wants
+# the browser-rendered version of the page
+URL_HEADER = 'X-Replay-Url'
+RENDERED_HEADER = 'X-Replay-Rendered'
+
+# Not replayed: the stand-in server frames bodies itself
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length'}
+
+
+class ReplayCorpus:
+    """Recorded responses: ``index.json`` (url -> status/headers/body hash) plus ``bodies/<sha256>``
+
+    Rendered pages are stored under the same URL as a separate entry.
+    """
+
+    def __init__(self, path=CORPUS_DIR):
+        self.path = path
+        self.bodies_dir = os.path.join(path, 'bodies')
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(os.path.join(path, 'index.json')) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(url, rendered=False):
+        # requests sends 'https://host' as 'https://host/'
+        parts = urlsplit(url)
+        if not parts.path:
+            url = parts._replace(path='/').geturl()
+        return f"rendered {url}" if rendered else url
+
+    def add(self, url, status, headers, body, rendered=False):
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = os.path.join(self.bodies_dir, digest)
+        if not os.path.exists(body_path):
+            with open(body_path, 'wb') as f:
+                f.write(body)
+        entry = {
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS},
+            'body': digest
+        }
+        with self._lock:
+            self.entries[self.key(url, rendered)] = entry
+
+    def get(self, url, rendered=False):
+        """(entry, body) for ``url``, or (None, None) when it was not recorded"""
+        entry = self.entries.get(self.key(url, rendered))
+        if entry is None:
+            return None, None
+        with open(os.path.join(self.bodies_dir, entry['body']), 'rb') as f:
+            return entry, f.read()
+
+    def urls(self):
+        return [key for key in self.entries if not key.startswith('rendered ')]
+
+    def save(self):
+        with self._lock:
+            data = dict(self.entries)
+        tmp_path = os.path.join(self.path, 'index.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(self.path, 'index.json'))
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter storing every response it receives in a ReplayCorpus
+
+    The raw (still encoded) body is read once, stored, and handed to
+    requests as a fresh stream, so streaming callers (images, sitemaps)
+    behave exactly as without recording.
+    """
+
+    def __init__(self, corpus, **kwargs):
+        super().__init__(**kwargs)
+        self.corpus = corpus
+
+    def build_response(self, req, resp):
+        body = resp.read(decode_content=False)
+        resp.release_conn()
+        self.corpus.add(req.url, resp.status, dict(resp.headers), body)
+        replayed = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=resp.headers,
+            status=resp.status,
+            reason=resp.reason,
+            preload_content=False,
+            request_method=req.method
+        )
+        return super().build_response(req, replayed)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter sending every request to the stand-in server
+
+    Mounted for ``http://`` and ``https://``, so nothing reaches the live
+    site. The original URL travels in a header and is restored on the
+    response.
+    """
+
+    def __init__(self, server_url, **kwargs):
+        super().__init__(**kwargs)
+        self.server_url = server_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        request = request.copy()
+        parts = urlsplit(original_url)
+        request.url = self.server_url + (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        request.headers[URL_HEADER] = original_url
+        response = super().send(request, **kwargs)
+        response.url = original_url
+        return response
+
+
+def replay_session(session, server_url):
+    """Route all of ``session``'s traffic to the stand-in server"""
+    adapter = ReplayAdapter(server_url)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def replay_render(session):
+    """Browser-tier stand-in: fetch the recorded rendered page (None if missing)"""
+    def render(url):
+        response = session.get(url, headers={RENDERED_HEADER: '1'}, timeout=30)
+        if response.status_code != 200:
+            return None
+        return response.text
+    return render
+
+
+class ReplayServer:
+    """Local stand-in HTTP server serving a ReplayCorpus
+
+    Every response is delayed by ``latency`` seconds plus up to ``jitter``
+    more, and a fraction ``error_rate`` of requests get a 503 instead.
+    Recorded ETags are honored with 304s. Unrecorded URLs get a 404.
+    """
+
+    def __init__(self, corpus, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, host='127.0.0.1', port=0):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'served': 0, 'not_modified': 0, 'errors': 0, 'missing': 0}
+
+        handler = type('ReplayHandler', (_ReplayHandler,), {'replay': self})
+        self._httpd = _QuietServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def draw(self):
+        """(delay, fail) for one request"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            return delay, self._random.random() < self.error_rate
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections are expected, not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    replay = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        replay = self.replay
+        replay.count('requests')
+        delay, fail = replay.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            replay.count('errors')
+            return self._send(503, {'Content-Type': 'text/plain'}, b'injected error')
+
+        url = self.headers.get(URL_HEADER) or urljoin(BASE_URL, self.path)
+        entry, body = replay.corpus.get(url, rendered=bool(self.headers.get(RENDERED_HEADER)))
+        if entry is None:
+            replay.count('missing')
+            return self._send(404, {'Content-Type': 'text/plain'}, b'not recorded')
+
+        etag = next((v for k, v in entry['headers'].items() if k.lower() == 'etag'), None)
+        if etag and self.headers.get('If-None-Match') == etag:
+            replay.count('not_modified')
+            return self._send(304, {'ETag': etag}, b'')
+
+        replay.count('served')
+        self._send(entry['status'], entry['headers'], body)
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def working_directory(path):
+    """Run with ``path`` as the current directory (instance/, static/ land there)"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+
+
+def record(corpus_path=CORPUS_DIR, limit=None, max_workers=4):
+    """Scrape the live site into a throwaway database, recording every response
+
+    ``limit`` caps the number of product pages. Returns the corpus.
+    """
+    from http_cache import ResponseCache
+    from migrations import database_app
+    from scraper_with_discontinued import RalphWilsonScraper
+
+    corpus = ReplayCorpus(os.path.abspath(corpus_path))
+    with tempfile.TemporaryDirectory() as workdir, working_directory(workdir):
+        app = database_app('record.db')
+        # An empty cache so every response is a full 200 worth recording
+        scraper = RalphWilsonScraper(app, max_workers=max_workers, http_cache=ResponseCache('http_cache'),
+                                     checkpoint_path=None)
+        adapter = RecordingAdapter(corpus)
+        scraper.session.mount('http://', adapter)
+        scraper.session.mount('https://', adapter)
+
+        render = scraper.render_page
+
+        def recording_render(url):
+            html = render(url)
+            if html is not None:
+                corpus.add(url, 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode('utf-8'), rendered=True)
+            return html
+
+        scraper.render_page = scraper.fetcher.render_fn = recording_render
+        if limit:
+            discover = scraper.discover_products
+            scraper.discover_products = lambda categories: discover(categories)[:limit]
+
+        scraper.scrape_all_products()
+        corpus.save()
+    logger.info(f"Recorded {len(corpus)} responses to {corpus.path}")
+    return corpus
+
+
+def synthesize(corpus_path, products=200, base_url=BASE_URL, seed=1):
+    """Write a synthetic corpus shaped like the live site (no network needed)
+
+    robots.txt, a sitemap, the home page, ``products`` product pages across
+    the categories and one small JPEG per product. One page in ten only
+    works rendered, so the browser-tier path is exercised too.
+    """
+    from PIL import Image
+
+    rng = random.Random(seed)
+    corpus = ReplayCorpus(corpus_path)
+    html = {'Content-Type': 'text/html; charset=utf-8'}
+    categories = ['laminados', 'cuarzo', 'superficie-solida', 'metales-decorativos', 'thinscape']
+    filler = ''.join(f'<p>Texto de relleno {i} para el pie de página.</p>' for i in range(200))
+
+    corpus.add(f"{base_url}/robots.txt", 200, {'Content-Type': 'text/plain'},
+               f"User-agent: *\nSitemap: {base_url}/sitemap.xml\n".encode())
+    corpus.add(base_url, 200, html, f"<html><body><nav>{''.join(f'<a href=/productos/{c}>{c}</a>' for c in categories)}</nav>{filler}</body></html>".encode())
+
+    locs = []
+    for n in range(products):
+        category = categories[n % len(categories)]
+        url = f"{base_url}/productos/{category}/producto-{n}"
+        image_url = f"{base_url}/media/catalog/product/{n}.jpg"
+        locs.append(url)
+        page = (
+            f'<html><head><title>Producto {n}</title><meta name="description" content="Producto {n}"></head><body>'
+            f'<header><nav>{filler}</nav></header><main><div class="product-info-main">'
+            f'<h1 class="page-title">{category.title()} {n}</h1>'
+            f'<div class="product-description">Descripción del producto {n}</div>'
+            f'<div class="product-image"><img src="{image_url}"></div>'
+            f'<div class="product-specs"><div class="spec-row"><strong>Acabado:</strong> Mate</div>'
+            f'<div class="spec-row"><strong>Código:</strong> {7900 + n}-60</div>'
+            f'<div class="spec-row"><strong>Dimensiones:</strong> 1220 x 2440 mm</div></div>'
+            f'</div></main><footer>{filler}</footer></body></html>'
+        )
+        headers = dict(html, ETag=f'"p{n}"')
+        if n % 10 == 9:
+            # A JavaScript shell over plain HTTP; the content only when rendered
+            corpus.add(url, 200, headers, b'<html><body><div id="app"></div></body></html>')
+            corpus.add(url, 200, html, page.encode(), rendered=True)
+        else:
+            corpus.add(url, 200, headers, page.encode())
+
+        image = io.BytesIO()
+        Image.new('RGB', (320, 240), tuple(rng.randrange(256) for _ in range(3))).save(image, 'JPEG')
+        corpus.add(image_url, 200, {'Content-Type': 'image/jpeg', 'ETag': f'"i{n}"'}, image.getvalue())
+
+    sitemap = ''.join(f'<url><loc>{loc}</loc></url>' for loc in locs)
+    corpus.add(f"{base_url}/sitemap.xml", 200, {'Content-Type': 'application/xml'},
+               f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemap}</urlset>'.encode())
+    corpus.save()
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_cmd = commands.add_parser('record', help='scrape the live site, recording every response')
+    record_cmd.add_argument('--corpus', default=CORPUS_DIR)
+    record_cmd.add_argument('--limit', type=int, help='maximum number of product pages')
+    record_cmd.add_argument('--workers', type=int, default=4)
+
+    serve_cmd = commands.add_parser('serve', help='serve a corpus from a stand-in server')
+    serve_cmd.add_argument('--corpus', default=CORPUS_DIR)
+    serve_cmd.add_argument('--port', type=int, default=8001)
+    serve_cmd.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    serve_cmd.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds')
+    serve_cmd.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+
+    synth_cmd = commands.add_parser('synthesize', help='write a synthetic corpus')
+    synth_cmd.add_argument('--corpus', default=CORPUS_DIR)
+    synth_cmd.add_argument('--products', type=int, default=200)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'record':
+        record(args.corpus, args.limit, args.workers)
+    elif args.command == 'synthesize':
+        corpus = synthesize(args.corpus, args.products)
+        print(f"Wrote {len(corpus)} responses to {corpus.path}")
+    else:
+        server = ReplayServer(ReplayCorpus(args.corpus), args.latency, args.jitter, args.error_rate, port=args.port)
+        print(f"Serving {len(server.corpus)} responses on {server.url} (Ctrl+C to stop)")
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
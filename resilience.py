@@ -0,0 +1,161 @@
+import time
+import random
+import threading
+import logging
+from urllib.parse import urlparse
+import requests
+from selenium.common.exceptions import WebDriverException
+from rate_limiter import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint timeouts in seconds
+DEFAULT_TIMEOUTS = {
+    'home': 15,
+    'product': 20,
+    'image': 30,
+    'browser': 25,
+    'sitemap': 30,
+}
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    WebDriverException, TimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+
+class RetryableStatusError(Exception):
+    """A response whose status code is worth retrying"""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after a cool-down
+
+    While open every call fails fast. After ``reset_timeout`` one trial call
+    is let through; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ResilienceLayer:
+    """Bounded retries with jittered exponential backoff and per-host breakers
+
+    ``call(endpoint, url, fn)`` runs ``fn(timeout)`` with the endpoint's
+    timeout. Connection errors, timeouts, WebDriver failures and responses
+    with a status in RETRY_STATUSES are retried up to ``max_attempts`` times,
+    waiting ``uniform(0, min(max_delay, base_delay * 2**n))`` (full jitter) or
+    the server's Retry-After, whichever is longer. Other exceptions propagate
+    untouched. Everything retried or abandoned is kept for the run report.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, timeouts=None,
+                 failure_threshold=5, reset_timeout=60):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self.retried = {}
+        self.abandoned = []
+
+    def call(self, endpoint, url, fn):
+        breaker = self._breaker(url)
+        timeout = self.timeouts.get(endpoint, 30)
+
+        for attempt in range(1, self.max_attempts + 1):
+            if not breaker.allow():
+                self._abandon(endpoint, url, 'circuit open')
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}, skipping {url}")
+
+            try:
+                result = fn(timeout)
+                status_code = getattr(result, 'status_code', None)
+                if status_code in RETRY_STATUSES:
+                    raise RetryableStatusError(
+                        status_code,
+                        parse_retry_after(result.headers.get('Retry-After'))
+                    )
+                breaker.record_success()
+                return result
+
+            except (RetryableStatusError,) + RETRY_EXCEPTIONS as e:
+                breaker.record_failure()
+                if attempt == self.max_attempts:
+                    self._abandon(endpoint, url, str(e))
+                    raise
+
+                delay = self.backoff(attempt, getattr(e, 'retry_after', None))
+                with self._lock:
+                    self.retried[url] = self.retried.get(url, 0) + 1
+                logger.info(f"Retrying {endpoint} {url} in {delay:.1f}s (attempt {attempt} failed: {e})")
+                time.sleep(delay)
+
+    def backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def report(self):
+        with self._lock:
+            return {
+                'retries': sum(self.retried.values()),
+                'retried_urls': dict(self.retried),
+                'abandoned': list(self.abandoned),
+                'open_circuits': [host for host, b in self._breakers.items() if b.state != 'closed'],
+            }
+
+    def _abandon(self, endpoint, url, reason):
+        logger.warning(f"Giving up on {endpoint} {url}: {reason}")
+        with self._lock:
+            self.abandoned.append({'endpoint': endpoint, 'url': url, 'reason': reason})
+
+    def _breaker(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
@@ -0,0 +1,167 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from models import ScrapingLog, db
+
+logger = logging.getLogger(__name__)
+
+# A running log whose heartbeat is older than this belongs to a dead process
+STALE_AFTER = timedelta(minutes=30)
+
+
+def recover_stale_runs(stale_after=STALE_AFTER):
+    """Mark 'running' logs without a recent heartbeat as 'interrupted'
+
+    Must run inside an app context. Returns the recovered logs; a scraper
+    holding a checkpoint for one of them can take it over and resume.
+    """
+    cutoff = datetime.utcnow() - stale_after
+    stale = [
+        log for log in ScrapingLog.query.filter_by(status='running').all()
+        if (log.heartbeat_at or log.start_time or datetime.min) < cutoff
+    ]
+    for log in stale:
+        logger.warning(f"Scraping log {log.id} has had no heartbeat since "
+                       f"{log.heartbeat_at or log.start_time}; marking it interrupted")
+        log.status = 'interrupted'
+    if stale:
+        db.session.commit()
+    return stale
+
+
+def find_running_log(stale_after=STALE_AFTER):
+    """The live 'running' log, if any, after recovering stale ones"""
+    recover_stale_runs(stale_after)
+    return ScrapingLog.query.filter_by(status='running').first()
+
+
+class RunHeartbeat:
+    """Refresh a running log's ``heartbeat_at`` every ``interval`` seconds
+
+    Runs in its own thread with its own app context and session, so slow
+    phases (discovery, the image drain, derivative generation) keep a live
+    run from looking stale to ``recover_stale_runs``.
+    """
+
+    def __init__(self, app, log_id, interval=60.0):
+        self.app = app
+        self.log_id = log_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='run-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                try:
+                    ScrapingLog.query.filter_by(id=self.log_id, status='running').update(
+                        {'heartbeat_at': datetime.utcnow()}, synchronize_session=False
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    logger.warning(f"Could not record heartbeat for scraping log {self.log_id}: {e}")
+                    db.session.rollback()
+            db.session.remove()
+
+
+class RunCheckpoint:
+    """Durable queue and results of one scraping run, for resuming after a crash
+
+    Every queued item is stored as 'pending'. Finished items are buffered
+    with their extraction result and written as 'done' in one transaction by
+    ``flush()``, which the scraper calls with each database commit. Items
+    that failed are not recorded and stay 'pending'. After a crash a new run
+    reloads the pending items and the results of the done ones instead of
+    discovering and fetching everything again. ``finish()``
+    clears the checkpoint once the run completes.
+    """
+
+    def __init__(self, path=os.path.join('instance', 'scrape_checkpoint.db')):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS items (
+                url TEXT PRIMARY KEY,
+                info TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                seq INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                result TEXT
+            );
+        ''')
+        self._buffer = []
+
+    def log_id(self):
+        """Id of the ScrapingLog this checkpoint belongs to, or None"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'log_id'").fetchone()
+        return int(row[0]) if row else None
+
+    def start(self, log_id, items, incremental=False):
+        """Replace any previous checkpoint with a new run's queue
+
+        ``items`` are (product_info, priority) pairs.
+        """
+        with self._conn:
+            self._conn.execute('DELETE FROM meta')
+            self._conn.execute('DELETE FROM items')
+            self._conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('log_id', str(log_id)),
+                ('incremental', json.dumps(incremental)),
+                ('started_at', datetime.utcnow().isoformat()),
+            ])
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO items (url, info, priority, seq) VALUES (?, ?, ?, ?)',
+                ((info['url'], json.dumps(info), priority, seq) for seq, (info, priority) in enumerate(items))
+            )
+
+    def pending(self):
+        """(product_info, priority) pairs not finished yet, in queue order"""
+        rows = self._conn.execute(
+            "SELECT info, priority FROM items WHERE state = 'pending' ORDER BY priority DESC, seq"
+        ).fetchall()
+        return [(json.loads(info), priority) for info, priority in rows]
+
+    def done(self):
+        """(product_info, result) pairs already finished; result may be None"""
+        rows = self._conn.execute("SELECT info, result FROM items WHERE state = 'done' ORDER BY seq").fetchall()
+        return [(json.loads(info), json.loads(result) if result else None) for info, result in rows]
+
+    def record(self, url, result):
+        """Buffer one finished item until the next ``flush()``"""
+        self._buffer.append((json.dumps(result) if result else None, url))
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany("UPDATE items SET state = 'done', result = ? WHERE url = ?", self._buffer)
+        self._buffer = []
+
+    def counts(self):
+        return dict(self._conn.execute('SELECT state, COUNT(*) FROM items GROUP BY state').fetchall())
+
+    def finish(self):
+        """Drop the checkpoint after a completed run"""
+        self._buffer = []
+        with self._conn:
+            self._conn.execute('DELETE FROM meta')
+            self._conn.execute('DELETE FROM items')
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,104 @@
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from models import ScrapeRunMetrics, db
+
+logger = logging.getLogger(__name__)
+
+
+class RunMetrics:
+    """Collects one scraping run's metrics and stores them as a ScrapeRunMetrics row
+
+    ``response_hook`` is registered on the scraper's session and counts every
+    HTTP response by status code (retries and 304 revalidations included).
+    ``lap(name)`` times the sequential phases of a run and ``count_bytes(n)``
+    adds bytes fetched outside the cached session (streamed sitemaps, pages
+    rendered in the browser). Everything else is read from the reports the
+    scraper components already keep.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        """Reset the counters at the beginning of a run"""
+        with self._lock:
+            self.started = self._last_lap = time.perf_counter()
+            self.status_counts = Counter()
+            self.phases = {}
+            self.extra_bytes = 0
+
+    def response_hook(self, response, *args, **kwargs):
+        with self._lock:
+            self.status_counts[response.status_code] += 1
+
+    def count_bytes(self, size):
+        with self._lock:
+            self.extra_bytes += size
+
+    def lap(self, name):
+        """Record the time since the previous lap (or the start) as phase ``name``"""
+        now = time.perf_counter()
+        with self._lock:
+            self.phases[name] = round(self.phases.get(name, 0.0) + now - self._last_lap, 3)
+            self._last_lap = now
+
+    def record(self, log, products, pipeline_snapshot=None, cache_report=None, image_stats=None, write_report=None,
+               fetch_report=None):
+        """Add the ScrapeRunMetrics row for ``log`` to the session (the caller commits)
+
+        ``products`` holds the new/updated/unchanged/discontinued/missing
+        counts. Bytes downloaded are HTML/XML responses read through the cache,
+        streamed images and the bytes passed to ``count_bytes()``. Parse
+        percentiles come from the per-page parse times in ``fetch_report``,
+        so pages skipped as unchanged do not count.
+        """
+        wall_seconds = time.perf_counter() - self.started
+        stages = {stage['name']: stage for stage in pipeline_snapshot or []}
+        cache_report = cache_report or {}
+        image_stats = image_stats or {}
+        write_report = write_report or {}
+        fetch_report = fetch_report or {}
+        pages = stages['write']['processed'] if 'write' in stages else 0
+        with self._lock:
+            status_counts = {str(code): count for code, count in sorted(self.status_counts.items())}
+            phases = dict(self.phases)
+            extra_bytes = self.extra_bytes
+
+        metrics = ScrapeRunMetrics(
+            log_id=log.id,
+            status=log.status,
+            wall_seconds=round(wall_seconds, 3),
+            pages=pages,
+            pages_per_second=round(pages / wall_seconds, 2) if wall_seconds else 0.0,
+            phase_seconds=json.dumps(phases),
+            stage_seconds=json.dumps({name: stage['seconds'] for name, stage in stages.items() if 'seconds' in stage}),
+            requests=sum(status_counts.values()),
+            status_counts=json.dumps(status_counts),
+            bytes_downloaded=cache_report.get('bytes_downloaded', 0) + image_stats.get('bytes', 0) + extra_bytes,
+            bytes_saved=cache_report.get('bytes_saved', 0),
+            cache_hits=cache_report.get('hits', 0) + image_stats.get('skipped', 0),
+            cache_misses=cache_report.get('misses', 0),
+            parse_p50_ms=fetch_report.get('parse_p50_ms'),
+            parse_p95_ms=fetch_report.get('parse_p95_ms'),
+            write_seconds=write_report.get('write_seconds'),
+            write_batches=write_report.get('batches', 0),
+            products_new=products.get('new', 0),
+            products_updated=products.get('updated', 0),
+            products_unchanged=products.get('unchanged', 0),
+            products_discontinued=products.get('discontinued', 0),
+            products_missing=products.get('missing', 0)
+        )
+        # A resumed run replaces the metrics its interrupted attempt stored
+        ScrapeRunMetrics.query.filter_by(log_id=log.id).delete()
+        db.session.add(metrics)
+        return metrics
+
+
+def recent_run_metrics(limit=20):
+    """Metrics of the last ``limit`` runs, oldest first (for charts)"""
+    rows = ScrapeRunMetrics.query.order_by(ScrapeRunMetrics.log_id.desc()).limit(limit).all()
+    return [row.to_dict() for row in reversed(rows)]
@@ -1,8 +1,8 @@
 import threading
 import time
 from datetime import datetime, timedelta
-from models import ScrapingLog, db
 from scraper_simple import run_scraper
+from run_checkpoint import find_running_log
 import logging
 
 logger = logging.getLogger(__name__)
@@ -56,8 +56,9 @@ class ScrapingScheduler:
                 try:
                     logger.info("Automatic scraping triggered by timer")
                     with self.app.app_context():
-                        # Check if another scraping is already running
-                        running_log = ScrapingLog.query.filter_by(status='running').first()
+                        # Check if another scraping is already running (logs left
+                        # 'running' by a dead process are marked interrupted first)
+                        running_log = find_running_log()
                         if running_log:
                             logger.info("Skipping automatic scraping - another scraping is already running")
                             self.next_run = datetime.now() + timedelta(minutes=self.interval_minutes)
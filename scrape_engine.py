@@ -0,0 +1,273 @@
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentFetcher:
+    """Run a fetch function over many items with a bounded number in flight"""
+
+    def __init__(self, fetch_fn, max_workers=4):
+        self.fetch_fn = fetch_fn
+        self.max_workers = max(1, int(max_workers))
+
+    def run(self, items):
+        """Yield (item, result, error) tuples in completion order
+
+        At most ``max_workers`` fetches are in flight at any time, so memory
+        stays bounded no matter how many items are queued.
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='scrape-worker') as executor:
+            in_flight = {}
+
+            def submit_next():
+                for item in items:
+                    in_flight[executor.submit(self.fetch_fn, item)] = item
+                    return True
+                return False
+
+            for _ in range(self.max_workers):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    try:
+                        yield item, future.result(), None
+                    except Exception as e:
+                        logger.error(f"Fetch worker failed for {item}: {e}")
+                        yield item, None, e
+                    submit_next()
+
+
+# End-of-stream marker passed between pipeline stages
+_DONE = object()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values`` (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Stage:
+    """One pipeline stage: ``fn(item, payload) -> payload`` run by ``workers`` threads
+
+    The stage reads from a bounded input queue of ``queue_size`` envelopes
+    (default twice its workers); a full queue blocks the stage feeding it.
+    The last ``samples`` call durations are kept for latency percentiles.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=None, samples=10000):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=queue_size or 2 * self.workers)
+        self.active = 0
+        self.stats = {'processed': 0, 'errors': 0, 'busy': 0, 'seconds': 0.0}
+        self.durations = deque(maxlen=samples)
+
+
+class ScrapePipeline:
+    """Stages connected by bounded queues, each with its own worker threads
+
+    A feeder thread takes items from the source (the discover stage) and
+    every item travels through the stages as an ``(item, payload, error)``
+    envelope. Stages are skipped for envelopes that already carry an error.
+    ``run()`` yields the envelopes leaving the last stage to the caller,
+    which is the write stage. Because every queue is bounded, a slow stage
+    backs up the ones before it instead of piling up pages in memory.
+    ``close()`` (also run when the consumer stops early) stops feeding and
+    lets workers finish the call they are in, then discards the rest.
+    Queue depth, busy workers and throughput per stage are logged every
+    ``report_every`` seconds and available from ``snapshot()``.
+    """
+
+    def __init__(self, stages, output_size=None, report_every=10.0):
+        self.stages = list(stages)
+        self.output = queue.Queue(maxsize=output_size or 2 * self.stages[-1].workers)
+        self.report_every = report_every
+        self.source_error = None
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = None
+        self._finished = None
+        self._fed = 0
+        self._written = 0
+        self._write_seconds = 0.0
+        self._write_durations = deque(maxlen=10000)
+
+    def run(self, items):
+        """Yield (item, payload, error) tuples in completion order"""
+        self._start(items)
+        next_report = time.monotonic() + self.report_every
+        try:
+            while True:
+                try:
+                    envelope = self.output.get(timeout=0.5)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    envelope = None
+                if envelope is _DONE:
+                    break
+                if envelope is not None:
+                    # Time the consumer spends on the item is the write stage's
+                    started = time.perf_counter()
+                    yield envelope
+                    elapsed = time.perf_counter() - started
+                    with self._lock:
+                        self._written += 1
+                        self._write_seconds += elapsed
+                        self._write_durations.append(elapsed)
+                if self.report_every and time.monotonic() >= next_report:
+                    logger.info(f"Pipeline: {self.describe()}")
+                    next_report = time.monotonic() + self.report_every
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the pipeline and wait for its threads"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._started and not self._finished:
+            self._finished = time.monotonic()
+
+    def snapshot(self):
+        """Per-stage queue depth, busy workers, items processed, items/s and busy seconds"""
+        elapsed = (self._finished or time.monotonic()) - self._started if self._started else 0.0
+
+        def rate(count):
+            return round(count / elapsed, 2) if elapsed else 0.0
+
+        with self._lock:
+            stages = [{'name': 'discover', 'workers': 1, 'busy': 0, 'queued': 0, 'capacity': 0,
+                       'processed': self._fed, 'errors': int(self.source_error is not None),
+                       'per_second': rate(self._fed), 'ms_per_item': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0}]
+            for stage in self.stages:
+                stats = stage.stats
+                stages.append({
+                    'name': stage.name,
+                    'workers': stage.workers,
+                    'busy': stats['busy'],
+                    'queued': stage.queue.qsize(),
+                    'capacity': stage.queue.maxsize,
+                    'processed': stats['processed'],
+                    'errors': stats['errors'],
+                    'per_second': rate(stats['processed']),
+                    'seconds': round(stats['seconds'], 3),
+                    'ms_per_item': round(stats['seconds'] * 1000 / stats['processed'], 1) if stats['processed'] else 0.0,
+                    'p50_ms': round(percentile(stage.durations, 0.5) * 1000, 1),
+                    'p95_ms': round(percentile(stage.durations, 0.95) * 1000, 1),
+                })
+            written = self._written
+            stages.append({'name': 'write', 'workers': 1, 'busy': 0, 'queued': self.output.qsize(),
+                           'capacity': self.output.maxsize, 'processed': written, 'errors': 0,
+                           'per_second': rate(written), 'seconds': round(self._write_seconds, 3),
+                           'ms_per_item': round(self._write_seconds * 1000 / written, 1) if written else 0.0,
+                           'p50_ms': round(percentile(self._write_durations, 0.5) * 1000, 1),
+                           'p95_ms': round(percentile(self._write_durations, 0.95) * 1000, 1)})
+        return stages
+
+    def describe(self):
+        return ' | '.join(
+            f"{s['name']} {s['busy']}/{s['workers']} busy, queue {s['queued']}/{s['capacity']}, "
+            f"{s['processed']} done ({s['per_second']}/s)"
+            for s in self.snapshot()
+        )
+
+    def _start(self, items):
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._finished = None
+        self._threads = [threading.Thread(target=self._feed, args=(items,), name='pipeline-discover', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            stage.active = stage.workers
+            self._threads.extend(
+                threading.Thread(target=self._work, args=(index,), name=f'pipeline-{stage.name}-{n}', daemon=True)
+                for n in range(stage.workers)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def _feed(self, items):
+        first = self.stages[0]
+        try:
+            for item in items:
+                if not self._put(first.queue, (item, None, None)):
+                    return
+                with self._lock:
+                    self._fed += 1
+        except Exception as e:
+            # Whatever was already queued still runs to completion
+            logger.error(f"Pipeline source failed: {e}")
+            self.source_error = e
+        for _ in range(first.workers):
+            self._put(first.queue, _DONE)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        target = downstream.queue if downstream else self.output
+
+        while not self._stop.is_set():
+            try:
+                envelope = stage.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if envelope is _DONE:
+                break
+
+            item, payload, error = envelope
+            if error is None:
+                with self._lock:
+                    stage.stats['busy'] += 1
+                started = time.perf_counter()
+                try:
+                    payload = stage.fn(item, payload)
+                except Exception as e:
+                    logger.error(f"{stage.name} stage failed for {item}: {e}")
+                    error = e
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    stats = stage.stats
+                    stats['busy'] -= 1
+                    stats['processed'] += 1
+                    stats['seconds'] += elapsed
+                    stage.durations.append(elapsed)
+                    if error is not None:
+                        stats['errors'] += 1
+            if not self._put(target, (item, payload, error)):
+                return
+
+        # The last worker to finish ends the stream for the next stage
+        with self._lock:
+            stage.active -= 1
+            last = stage.active == 0
+        if last and not self._stop.is_set():
+            for _ in range(downstream.workers if downstream else 1):
+                self._put(target, _DONE)
+
+    def _put(self, target, envelope):
+        """Blocking put that gives up when the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                target.put(envelope, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -15,23 +15,72 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+from scrape_engine import ConcurrentFetcher
+from driver_pool import WebDriverPool
+from tiered_fetch import TieredFetcher
+from rate_limiter import AdaptiveRateLimiter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RalphWilsonScraper:
-    def __init__(self, app=None):
+    def __init__(self, app=None, max_workers=4, requests_per_second=4.0, max_requests_per_second=10.0,
+                 driver_pool_size=None, driver_max_pages=200):
         self.base_url = "https://www.ralphwilson.com.mx"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         self.app = app
-        self.driver = None
+        
+        # Concurrency: workers borrow browsers from a shared pool and all
+        # fetch paths share one adaptive per-host rate limiter
+        self.max_workers = max_workers
+        self.rate_limiter = AdaptiveRateLimiter(
+            initial_rate=requests_per_second,
+            max_rate=max_requests_per_second
+        )
+        self.session.hooks['response'].append(self.rate_limiter.response_hook)
+        self.driver_pool = WebDriverPool(
+            self.setup_driver,
+            size=driver_pool_size or max_workers,
+            max_pages=driver_max_pages
+        )
+        
+        # Product pages are fetched with plain HTTP first; the browser pool is
+        # only used when the static HTML lacks the fields we extract
+        self.fetcher = TieredFetcher(
+            self.session,
+            self.render_page,
+            self.has_required_fields,
+            politeness=self.rate_limiter
+        )
+        
+        # Selectors tried in order for each product field
+        self.name_selectors = [
+            'h1.product-title',
+            'h1.page-title',
+            '.product-name h1',
+            'h1',
+            '.product-details h1'
+        ]
+        self.desc_selectors = [
+            '.product-description',
+            '.product-details .description',
+            '.product-info p',
+            'meta[name="description"]'
+        ]
+        self.img_selectors = [
+            '.product-image img',
+            '.product-gallery img',
+            '.hero-image img',
+            'img[data-role="product-image"]',
+            '.main-image img'
+        ]
         
     def setup_driver(self):
-        """Setup Selenium WebDriver for JavaScript-heavy pages"""
+        """Create a Selenium WebDriver for JavaScript-heavy pages (pool factory)"""
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -40,17 +89,27 @@ class RalphWilsonScraper:
         chrome_options.add_argument("--window-size=1920,1080")
         
         service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        return self.driver
+        return webdriver.Chrome(service=service, options=chrome_options)
     
     def close_driver(self):
-        """Close the WebDriver"""
-        if self.driver:
-            self.driver.quit()
+        """Close every WebDriver in the pool"""
+        self.driver_pool.close()
+        logger.info(f"WebDriver pool stats: {self.driver_pool.stats}")
+    
+    def log_fetch_report(self):
+        """Log how many product pages each fetch tier served this run"""
+        report = self.fetcher.report()
+        logger.info(
+            f"Fetch tiers: {report['http']} via HTTP ({report['http_hit_rate']:.0%}), "
+            f"{report['browser']} via browser ({report['browser_hit_rate']:.0%}), "
+            f"{report['escalated']} escalated, {report['failed']} failed"
+        )
+        return report
     
     def get_product_categories(self):
         """Extract product categories from the main navigation"""
         try:
+            self.rate_limiter.wait(self.base_url)
             response = self.session.get(self.base_url)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -80,18 +139,45 @@ class RalphWilsonScraper:
             logger.error(f"Error getting categories: {e}")
             return []
     
-    def scrape_product_page(self, url):
-        """Scrape individual product page for detailed information"""
+    def _browser_get(self, driver, url, timeout=10):
+        """Load ``url`` in ``driver`` under the rate limiter and return its HTML"""
+        self.rate_limiter.wait(url)
+        started = time.monotonic()
         try:
-            if not self.driver:
-                self.setup_driver()
-                
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+        except Exception:
+            # Selenium exposes no status code; a failed load counts as an error
+            self.rate_limiter.record(url, None, time.monotonic() - started)
+            raise
+        self.rate_limiter.record(url, 200, time.monotonic() - started)
+        return driver.page_source
+    
+    def render_page(self, url):
+        """Render a page in a pooled browser and return its HTML"""
+        try:
+            with self.driver_pool.driver() as driver:
+                return self._browser_get(driver, url)
+        except Exception as e:
+            logger.error(f"Error rendering page {url}: {e}")
+            return None
+    
+    def has_required_fields(self, soup):
+        """Check that a page has the name, image and spec markup we extract"""
+        if not any(soup.select_one(selector) for selector in self.name_selectors):
+            return False
+        if not any(soup.select_one(selector) for selector in self.img_selectors):
+            return False
+        return soup.find(['div', 'section'], class_=re.compile(r'spec|detail|info', re.I)) is not None
+    
+    def scrape_product_page(self, url):
+        """Scrape individual product page for detailed information"""
+        try:
+            soup = self.fetcher.fetch(url).soup
+            if soup is None:
+                return None
             
             product_data = {
                 'name': '',
@@ -105,29 +191,14 @@ class RalphWilsonScraper:
             }
             
             # Extract product name
-            name_selectors = [
-                'h1.product-title',
-                'h1.page-title',
-                '.product-name h1',
-                'h1',
-                '.product-details h1'
-            ]
-            
-            for selector in name_selectors:
+            for selector in self.name_selectors:
                 name_elem = soup.select_one(selector)
                 if name_elem:
                     product_data['name'] = name_elem.get_text(strip=True)
                     break
             
             # Extract description
-            desc_selectors = [
-                '.product-description',
-                '.product-details .description',
-                '.product-info p',
-                'meta[name="description"]'
-            ]
-            
-            for selector in desc_selectors:
+            for selector in self.desc_selectors:
                 if selector.startswith('meta'):
                     desc_elem = soup.select_one(selector)
                     if desc_elem:
@@ -140,15 +211,7 @@ class RalphWilsonScraper:
                         break
             
             # Extract main product image
-            img_selectors = [
-                '.product-image img',
-                '.product-gallery img',
-                '.hero-image img',
-                'img[data-role="product-image"]',
-                '.main-image img'
-            ]
-            
-            for selector in img_selectors:
+            for selector in self.img_selectors:
                 img_elem = soup.select_one(selector)
                 if img_elem:
                     img_src = img_elem.get('src') or img_elem.get('data-src')
@@ -206,9 +269,6 @@ class RalphWilsonScraper:
     def search_products(self, category_keyword=""):
         """Search for products using the site's search functionality"""
         try:
-            if not self.driver:
-                self.setup_driver()
-            
             # Try different search URLs
             search_urls = [
                 f"{self.base_url}/productos",
@@ -221,12 +281,10 @@ class RalphWilsonScraper:
             
             for search_url in search_urls:
                 try:
-                    self.driver.get(search_url)
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
+                    with self.driver_pool.driver() as driver:
+                        page_source = self._browser_get(driver, search_url)
                     
-                    soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                    soup = BeautifulSoup(page_source, 'html.parser')
                     
                     # Look for product links
                     product_links = soup.find_all('a', href=re.compile(r'/producto|/product|/laminado|/cuarzo', re.I))
@@ -289,8 +347,6 @@ class RalphWilsonScraper:
                         for product in products:
                             product['category'] = category['name']
                             all_products.append(product)
-                        
-                        time.sleep(2)  # Be respectful to the server
                     
                     # If no categories found, do a general search
                     if not all_products:
@@ -303,53 +359,58 @@ class RalphWilsonScraper:
                     # Process each product
                     processed_count = 0
                     
+                    # Skip products we already have (and duplicates within this run)
+                    # before any worker is started; only the main thread touches the DB
+                    pending = []
+                    seen_names = set()
                     for product_info in all_products:
+                        if product_info['name'] in seen_names:
+                            continue
+                        seen_names.add(product_info['name'])
+                        
+                        existing = Product.query.filter_by(
+                            name=product_info['name']
+                        ).first()
+                        
+                        if existing:
+                            logger.info(f"Product already exists: {product_info['name']}")
+                            continue
+                        pending.append(product_info)
+                    
+                    logger.info(f"Fetching {len(pending)} product pages with {self.max_workers} workers")
+                    
+                    # Workers fetch and download; results are written here as they complete
+                    fetcher = ConcurrentFetcher(self.fetch_product, max_workers=self.max_workers)
+                    
+                    for product_info, result, error in fetcher.run(pending):
                         try:
-                            # Check if product already exists
-                            existing = Product.query.filter_by(
-                                name=product_info['name']
-                            ).first()
-                            
-                            if existing:
-                                logger.info(f"Product already exists: {product_info['name']}")
+                            if error or not result:
                                 continue
                             
-                            # Scrape detailed product information
-                            detailed_data = self.scrape_product_page(product_info['url'])
+                            detailed_data, local_image_path = result
+                            
+                            # Create product record
+                            product = Product(
+                                name=detailed_data['name'] or product_info['name'],
+                                category=product_info['category'],
+                                description=detailed_data['description'],
+                                image_url=detailed_data['image_url'],
+                                local_image_path=local_image_path,
+                                product_url=product_info['url'],
+                                design_group=detailed_data['design_group'],
+                                color_group=detailed_data['color_group'],
+                                finish=detailed_data['finish'],
+                                dimensions=detailed_data['dimensions'],
+                                material_code=detailed_data['material_code'],
+                                surface_type=product_info['category']
+                            )
                             
-                            if detailed_data:
-                                # Download and save image
-                                local_image_path = None
-                                if detailed_data.get('image_url'):
-                                    local_image_path = self.download_image(
-                                        detailed_data['image_url'],
-                                        product_info['name']
-                                    )
-                                
-                                # Create product record
-                                product = Product(
-                                    name=detailed_data['name'] or product_info['name'],
-                                    category=product_info['category'],
-                                    description=detailed_data['description'],
-                                    image_url=detailed_data['image_url'],
-                                    local_image_path=local_image_path,
-                                    product_url=product_info['url'],
-                                    design_group=detailed_data['design_group'],
-                                    color_group=detailed_data['color_group'],
-                                    finish=detailed_data['finish'],
-                                    dimensions=detailed_data['dimensions'],
-                                    material_code=detailed_data['material_code'],
-                                    surface_type=product_info['category']
-                                )
-                                
-                                db.session.add(product)
-                                processed_count += 1
-                                
-                                if processed_count % 10 == 0:
-                                    db.session.commit()
-                                    logger.info(f"Processed {processed_count} products")
+                            db.session.add(product)
+                            processed_count += 1
                             
-                            time.sleep(1)  # Rate limiting
+                            if processed_count % 10 == 0:
+                                db.session.commit()
+                                logger.info(f"Processed {processed_count} products")
                             
                         except Exception as e:
                             logger.error(f"Error processing product {product_info['name']}: {e}")
@@ -357,6 +418,7 @@ class RalphWilsonScraper:
                     
                     # Final commit
                     db.session.commit()
+                    self.log_fetch_report()
                     
                     # Update log
                     log.end_time = datetime.utcnow()
@@ -378,6 +440,22 @@ class RalphWilsonScraper:
                 finally:
                     self.close_driver()
     
+    def fetch_product(self, product_info):
+        """Worker task: scrape one product page and download its image"""
+        detailed_data = self.scrape_product_page(product_info['url'])
+        if not detailed_data:
+            return None
+        
+        # Download and save image
+        local_image_path = None
+        if detailed_data.get('image_url'):
+            local_image_path = self.download_image(
+                detailed_data['image_url'],
+                product_info['name']
+            )
+        
+        return detailed_data, local_image_path
+    
     def download_image(self, image_url, product_name):
         """Download and save product image"""
         try:
@@ -395,6 +473,7 @@ class RalphWilsonScraper:
             filepath = os.path.join(images_dir, filename)
             
             # Download image
+            self.rate_limiter.wait(image_url)
             response = self.session.get(image_url, timeout=30)
             response.raise_for_status()
             
@@ -408,7 +487,7 @@ class RalphWilsonScraper:
             return None
 
 
-def run_scraper(app):
+def run_scraper(app, max_workers=4):
     """Function to run the scraper"""
-    scraper = RalphWilsonScraper(app)
+    scraper = RalphWilsonScraper(app, max_workers=max_workers)
     return scraper.scrape_all_products()
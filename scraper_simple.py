@@ -5,6 +5,7 @@ import os
 import re
 from urllib.parse import urljoin, urlparse
 from models import Product, ScrapingLog, db
+from suggest_index import refresh_suggest_index
 from datetime import datetime
 import logging
 
@@ -242,6 +243,7 @@ class RalphWilsonScraper:
                     if discontinued_count > 0:
                         log.errors = f"Found {discontinued_count} discontinued products out of {processed_count} total"
                     db.session.commit()
+                    refresh_suggest_index()
                     
                     logger.info(f"Scraping completed. Processed {processed_count} products ({discontinued_count} discontinued)")
                     return processed_count
@@ -252,6 +254,7 @@ class RalphWilsonScraper:
                     log.errors = str(e)
                     log.end_time = datetime.utcnow()
                     db.session.commit()
+                    refresh_suggest_index()
                     return 0
 
 def run_scraper(app):
@@ -1,12 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
 import time
 import os
 import re
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
+from sqlalchemy import update
 from models import Product, ScrapingLog, db
 from datetime import datetime
+import json
+import itertools
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -15,33 +17,145 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+from scrape_engine import ScrapePipeline, Stage
+from driver_pool import WebDriverPool
+from tiered_fetch import TieredFetcher
+from http_cache import CachedSession
+from rate_limiter import AdaptiveRateLimiter
+from resilience import ResilienceLayer
+from image_pipeline import ImagePipeline
+from image_derivatives import DerivativeGenerator, derivative_paths
+from html_parse import parse_html, parse_product_html, parse_links
+from discontinued_classifier import DiscontinuedClassifier, IMAGE_PATTERNS
+from product_extract import (
+    extract_product, extract_fields, is_complete, exit_with_parent, pool_context,
+    NAME_SELECTORS, DESCRIPTION_SELECTORS, IMAGE_SELECTORS, FALLBACK_SELECTORS
+)
+from selector_stats import AdaptiveSelectors
+from sitemap_discovery import SitemapDiscovery
+from crawl_frontier import CrawlFrontier, canonicalize_url
+from run_checkpoint import RunCheckpoint, RunHeartbeat, recover_stale_runs
+from product_writer import ProductWriter
+from run_metrics import RunMetrics
+from suggest_index import refresh_suggest_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RalphWilsonScraper:
-    def __init__(self, app=None):
+    def __init__(self, app=None, max_workers=4, requests_per_second=4.0, max_requests_per_second=10.0,
+                 driver_pool_size=None, driver_max_pages=200, http_cache=None,
+                 incremental=False, image_workers=4, derivative_workers=None, frontier_path=None,
+                 checkpoint_path=os.path.join('instance', 'scrape_checkpoint.db'), write_batch_size=100,
+                 parse_workers=None, pipeline_queue_size=None, extract_workers=None, progress=None):
         self.base_url = "https://www.ralphwilson.com.mx"
-        self.session = requests.Session()
+        # Persistent response cache: repeat runs revalidate with ETag /
+        # Last-Modified instead of downloading unchanged pages and images
+        self.session = CachedSession(http_cache)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         self.app = app
-        self.driver = None
         
-        # Discontinued product indicators
-        self.discontinued_image_urls = [
-            "NoImage783x323DetailView.jpg",
-            "placeholder/default/NoImage",
-            "noimage",
-            "placeholder.jpg",
-            "default-image",
-            "no-image"
-        ]
+        # Incremental mode re-checks every listed product but only re-parses
+        # and re-writes pages whose content fingerprint changed
+        self.incremental = incremental
+        self.known_product_ids = {}
+        self.known_fingerprints = {}
+        
+        # Optional SQLite file with the URLs finished by the current run, so a
+        # crashed run does not fetch them again (cleared when a run completes)
+        self.frontier_path = frontier_path
+        
+        # Queue and results are checkpointed so a crashed run can resume
+        # (None disables checkpointing)
+        self.checkpoint_path = checkpoint_path
+        
+        # Products are written in batches with one upsert keyed on
+        # product_url; rows identical to the stored ones are not written.
+        # The scrape loop flushes, so each batch commits with the run's progress
+        self.writer = ProductWriter(batch_size=write_batch_size, auto_flush=False)
+        
+        # Concurrency: workers borrow browsers from a shared pool and all
+        # fetch paths share one adaptive per-host rate limiter
+        self.max_workers = max_workers
+        self.rate_limiter = AdaptiveRateLimiter(
+            initial_rate=requests_per_second,
+            max_rate=max_requests_per_second
+        )
+        self.session.hooks['response'].append(self.rate_limiter.response_hook)
+        
+        # Per-run metrics (stage times, status codes, bytes, product counts)
+        # stored as a ScrapeRunMetrics row next to the ScrapingLog
+        self.metrics = RunMetrics()
+        self.session.hooks['response'].append(self.metrics.response_hook)
+        
+        # Optional progress reporter (realtime_scraper.ScrapeProgress)
+        self.progress = progress
+        
+        # Pages flow fetch -> parse -> images -> write through bounded queues;
+        # each stage has its own workers (None sizes queues per stage)
+        self.parse_workers = parse_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.pipeline = None
+        
+        # HTML parsing and extraction are CPU-bound and run in a process pool
+        # (None: one process per CPU, 0: in the parse threads)
+        self.extract_workers = (os.cpu_count() or 1) if extract_workers is None else extract_workers
+        self._extract_pool = None
+        
+        # Bounded retries with backoff, per-endpoint timeouts and a circuit
+        # breaker per host for every network call
+        self.resilience = ResilienceLayer()
+        
+        # Images are a separate stage with their own workers, streamed to
+        # content-addressed files so identical images are stored once
+        self.images = ImagePipeline(
+            self.session,
+            max_workers=image_workers,
+            rate_limiter=self.rate_limiter,
+            resilience=self.resilience
+        )
+        # Thumbnails and WebP variants are CPU-bound and run in processes
+        self.derivatives = DerivativeGenerator(max_workers=derivative_workers)
+        self.driver_pool = WebDriverPool(
+            self.setup_driver,
+            size=driver_pool_size or max_workers,
+            max_pages=driver_max_pages
+        )
+        
+        # Product pages are fetched with plain HTTP first; the browser pool is
+        # only used when the static HTML lacks the fields we extract. Only
+        # the product blocks of each page are parsed (lxml + SoupStrainer)
+        self.fetcher = TieredFetcher(
+            self.session,
+            self.render_page,
+            self.has_required_fields,
+            politeness=self.rate_limiter,
+            resilience=self.resilience,
+            parser=parse_product_html
+        )
+        
+        # Selectors tried in order for each product field
+        self.name_selectors = list(NAME_SELECTORS)
+        self.desc_selectors = list(DESCRIPTION_SELECTORS)
+        self.img_selectors = list(IMAGE_SELECTORS)
+        # Tried most-successful-first (generic fallbacks stay in place);
+        # hit counts persist across runs
+        self.selectors = AdaptiveSelectors({
+            'name': self.name_selectors,
+            'description': self.desc_selectors,
+            'image': self.img_selectors
+        }, fixed=FALLBACK_SELECTORS)
+        
+        # Discontinued product indicators (image URLs, text and class names),
+        # matched in a single pass over each page
+        self.discontinued_image_urls = list(IMAGE_PATTERNS)
+        self.discontinued_classifier = DiscontinuedClassifier(image_patterns=self.discontinued_image_urls)
         
     def setup_driver(self):
-        """Setup Selenium WebDriver for JavaScript-heavy pages"""
+        """Create a Selenium WebDriver for JavaScript-heavy pages (pool factory)"""
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -50,84 +164,144 @@ class RalphWilsonScraper:
         chrome_options.add_argument("--window-size=1920,1080")
         
         service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        return self.driver
+        return webdriver.Chrome(service=service, options=chrome_options)
     
     def close_driver(self):
-        """Close the WebDriver"""
-        if self.driver:
-            self.driver.quit()
+        """Close every WebDriver in the pool"""
+        self.driver_pool.close()
+        logger.info(f"WebDriver pool stats: {self.driver_pool.stats}")
+    
+    def log_cache_report(self):
+        """Log HTTP cache hits, misses and bytes saved for this run"""
+        report = self.session.cache.report()
+        logger.info(
+            f"HTTP cache: {report['hits']} hits, {report['misses']} misses "
+            f"({report['hit_rate']:.0%}), {report['bytes_saved'] / 1024:.0f}KB saved, "
+            f"{report['evicted']} evicted, {report['cache_bytes'] / (1024 * 1024):.1f}MB on disk"
+        )
+        return report
+    
+    def record_resilience(self, log, max_details=200):
+        """Store what was retried and what was abandoned on the run's log row"""
+        report = self.resilience.report()
+        log.retries = report['retries']
+        log.abandoned = len(report['abandoned'])
+        log.retry_details = json.dumps({
+            'retried_urls': dict(list(report['retried_urls'].items())[:max_details]),
+            'abandoned': report['abandoned'][:max_details],
+            'open_circuits': report['open_circuits']
+        })
+        if report['retries'] or report['abandoned']:
+            logger.info(f"Retried {report['retries']} requests, abandoned {len(report['abandoned'])}")
+        return report
+    
+    def report_step(self, name):
+        if self.progress:
+            self.progress.step(name)
+    
+    def record_run_metrics(self, log, products):
+        """Store this run's ScrapeRunMetrics row (a failure here never fails the run)"""
+        try:
+            metrics = self.metrics.record(
+                log, products,
+                pipeline_snapshot=self.pipeline.snapshot() if self.pipeline else None,
+                cache_report=self.session.cache.report(),
+                image_stats=dict(self.images.stats),
+                write_report=self.writer.report(),
+                fetch_report=self.fetcher.report()
+            )
+            db.session.commit()
+            return metrics
+        except Exception as e:
+            logger.error(f"Error recording run metrics: {e}")
+            db.session.rollback()
+            return None
+    
+    def log_rate_report(self):
+        """Log the adapted request rate per host at the end of a run"""
+        report = self.rate_limiter.report()
+        for host, stats in report.items():
+            logger.info(
+                f"Rate limiter {host}: {stats['rate']} req/s after {stats['requests']} requests "
+                f"({stats['throttled']} throttled, latency ~{stats['latency_ewma']}s)"
+            )
+        return report
+    
+    def log_fetch_report(self):
+        """Log how many product pages each fetch tier served this run"""
+        report = self.fetcher.report()
+        logger.info(
+            f"Fetch tiers: {report['http']} via HTTP ({report['http_hit_rate']:.0%}), "
+            f"{report['browser']} via browser ({report['browser_hit_rate']:.0%}), "
+            f"{report['escalated']} escalated, {report['failed']} failed, "
+            f"{report['parse_ms_per_page']:.1f} ms parse time per page"
+        )
+        return report
+    
+    def log_write_report(self):
+        """Log how many rows the batched writer inserted, updated and skipped"""
+        report = self.writer.report()
+        logger.info(
+            f"Product writes: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged in {report['batches']} batches "
+            f"({report['rows_per_second']} rows/s)"
+        )
+        return report
+    
+    def log_pipeline_report(self):
+        """Log items handled, throughput and time per item for each pipeline stage"""
+        snapshot = self.pipeline.snapshot()
+        for stage in snapshot:
+            logger.info(
+                f"Pipeline stage {stage['name']}: {stage['processed']} items ({stage['per_second']}/s), "
+                f"{stage['ms_per_item']} ms per item (p50 {stage['p50_ms']} ms, p95 {stage['p95_ms']} ms) "
+                f"with {stage['workers']} workers, {stage['errors']} errors"
+            )
+        return snapshot
+    
+    def log_selector_report(self):
+        """Log select_one calls per page for each field and persist the selector stats"""
+        report = self.selectors.report()
+        for field, stats in report.items():
+            if stats['pages']:
+                logger.info(
+                    f"Selectors for {field}: {stats['calls_per_page']} select_one calls per page, "
+                    f"{stats['misses']} misses, winner {stats['order'][0][0]!r}"
+                )
+        self.selectors.save()
+        return report
     
     def is_discontinued_image(self, img_src):
         """Check if an image indicates a discontinued product"""
-        if not img_src:
-            return False
-            
-        img_src_lower = img_src.lower()
-        
-        # Check for specific discontinued image patterns
-        for pattern in self.discontinued_image_urls:
-            if pattern.lower() in img_src_lower:
-                logger.info(f"Discontinued product detected - image contains: {pattern}")
-                return True
-                
+        pattern = self.discontinued_classifier.match('image', img_src)
+        if pattern:
+            logger.info(f"Discontinued product detected - image contains: {pattern}")
+            return True
         return False
     
     def is_discontinued_product(self, soup):
         """Check if a product page indicates the product is discontinued"""
-        # Check for placeholder images
-        img_elements = soup.find_all('img', class_='img-responsive')
-        for img in img_elements:
-            img_src = img.get('src', '')
-            if self.is_discontinued_image(img_src):
-                return True
-        
-        # Check for other img tags with discontinued indicators
-        all_images = soup.find_all('img')
-        for img in all_images:
-            img_src = img.get('src', '')
-            if self.is_discontinued_image(img_src):
-                return True
-        
-        # Check for discontinued text indicators
-        discontinued_text_patterns = [
-            'discontinuado',
-            'discontinued',
-            'descontinuado',
-            'no disponible',
-            'not available',
-            'producto descontinuado',
-            'fuera de stock',
-            'out of stock'
-        ]
-        
-        page_text = soup.get_text().lower()
-        for pattern in discontinued_text_patterns:
-            if pattern in page_text:
-                logger.info(f"Discontinued product detected - text contains: {pattern}")
-                return True
-        
-        # Check for specific CSS classes that might indicate discontinued products
-        discontinued_classes = [
-            'discontinued',
-            'out-of-stock',
-            'unavailable',
-            'descontinuado'
-        ]
-        
-        for class_name in discontinued_classes:
-            if soup.find(class_=re.compile(class_name, re.I)):
-                logger.info(f"Discontinued product detected - class contains: {class_name}")
-                return True
-        
+        evidence = self.discontinued_classifier.classify(soup)
+        if evidence:
+            logger.info(
+                "Discontinued product detected - "
+                + ', '.join(f"{e.kind} contains: {e.pattern}" for e in evidence[:5])
+            )
+            return True
         return False
     
     def get_product_categories(self):
         """Extract product categories from the main navigation"""
         try:
-            response = self.session.get(self.base_url)
+            response = self.resilience.call(
+                'home', self.base_url,
+                lambda timeout: self._session_get(self.base_url, timeout)
+            )
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                logger.info("Home page not modified since last run, skipping parse")
+            else:
+                soup = parse_html(response.content)
             
             categories = []
             
@@ -151,149 +325,146 @@ class RalphWilsonScraper:
             logger.error(f"Error getting categories: {e}")
             return []
     
-    def scrape_product_page(self, url):
-        """Scrape individual product page for detailed information"""
+    def _session_get(self, url, timeout):
+        """Single rate-limited GET through the cached session"""
+        self.rate_limiter.wait(url)
+        return self.session.get(url, timeout=timeout)
+    
+    def _browser_get(self, driver, url, timeout=10):
+        """Load ``url`` in ``driver`` under the rate limiter and return its HTML"""
+        self.rate_limiter.wait(url)
+        started = time.monotonic()
         try:
-            if not self.driver:
-                self.setup_driver()
-                
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
+            driver.set_page_load_timeout(timeout)
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Check if product is discontinued first
-            is_discontinued = self.is_discontinued_product(soup)
-            
-            product_data = {
-                'name': '',
-                'description': '',
-                'image_url': '',
-                'design_group': '',
-                'color_group': '',
-                'finish': '',
-                'dimensions': '',
-                'material_code': '',
-                'discontinued': is_discontinued
-            }
-            
-            # Log discontinued status
-            if is_discontinued:
-                logger.warning(f"Product at {url} detected as DISCONTINUED")
-            
-            # Extract product name
-            name_selectors = [
-                'h1.product-title',
-                'h1.page-title',
-                '.product-name h1',
-                'h1',
-                '.product-details h1'
-            ]
-            
-            for selector in name_selectors:
-                name_elem = soup.select_one(selector)
-                if name_elem:
-                    product_data['name'] = name_elem.get_text(strip=True)
-                    break
-            
-            # Extract description
-            desc_selectors = [
-                '.product-description',
-                '.product-details .description',
-                '.product-info p',
-                'meta[name="description"]'
-            ]
-            
-            for selector in desc_selectors:
-                if selector.startswith('meta'):
-                    desc_elem = soup.select_one(selector)
-                    if desc_elem:
-                        product_data['description'] = desc_elem.get('content', '')
-                        break
-                else:
-                    desc_elem = soup.select_one(selector)
-                    if desc_elem:
-                        product_data['description'] = desc_elem.get_text(strip=True)
-                        break
-            
-            # Extract main product image (even if discontinued, we want to record the placeholder)
-            img_selectors = [
-                '.product-image img',
-                '.product-gallery img',
-                '.hero-image img',
-                'img[data-role="product-image"]',
-                '.main-image img',
-                'img.img-responsive'  # Specifically look for the img-responsive class
-            ]
-            
-            for selector in img_selectors:
-                img_elem = soup.select_one(selector)
-                if img_elem:
-                    img_src = img_elem.get('src') or img_elem.get('data-src')
-                    if img_src:
-                        product_data['image_url'] = urljoin(url, img_src)
-                        
-                        # Double-check if this image indicates discontinued status
-                        if self.is_discontinued_image(img_src) and not product_data['discontinued']:
-                            product_data['discontinued'] = True
-                            logger.warning(f"Product marked as discontinued due to image: {img_src}")
-                        break
-            
-            # Extract product specifications
-            spec_containers = soup.find_all(['div', 'section'], class_=re.compile(r'spec|detail|info', re.I))
-            
-            for container in spec_containers:
-                text = container.get_text().lower()
-                
-                if 'grupo de diseño' in text or 'design group' in text:
-                    product_data['design_group'] = self.extract_spec_value(container)
-                elif 'grupo de color' in text or 'color group' in text:
-                    product_data['color_group'] = self.extract_spec_value(container)
-                elif 'acabado' in text or 'finish' in text:
-                    product_data['finish'] = self.extract_spec_value(container)
-                elif 'dimensión' in text or 'dimension' in text:
-                    product_data['dimensions'] = self.extract_spec_value(container)
-                elif 'código' in text or 'code' in text:
-                    product_data['material_code'] = self.extract_spec_value(container)
-            
-            return product_data
-            
+        except Exception:
+            # Selenium exposes no status code; a failed load counts as an error
+            self.rate_limiter.record(url, None, time.monotonic() - started)
+            raise
+        self.rate_limiter.record(url, 200, time.monotonic() - started)
+        html = driver.page_source
+        self.metrics.count_bytes(len(html.encode('utf-8')))
+        return html
+    
+    def _render_once(self, url, timeout):
+        with self.driver_pool.driver() as driver:
+            return self._browser_get(driver, url, timeout)
+    
+    def render_page(self, url):
+        """Render a page in a pooled browser (with retries) and return its HTML"""
+        try:
+            return self.resilience.call(
+                'browser', url,
+                lambda timeout: self._render_once(url, timeout)
+            )
         except Exception as e:
-            logger.error(f"Error scraping product page {url}: {e}")
+            logger.error(f"Error rendering page {url}: {e}")
             return None
     
-    def extract_spec_value(self, container):
-        """Extract specification value from container"""
+    def has_required_fields(self, soup):
+        """Check that a page has the name, image and spec markup we extract"""
+        return is_complete(soup, self.selectors.orders())
+    
+    def scrape_product_page(self, url, skip_unchanged=False, known_fingerprint=None):
+        """Scrape individual product page for detailed information
+        
+        With ``skip_unchanged`` a page the server reports as not modified is
+        not parsed at all and ``{'not_modified': True}`` is returned instead.
+        With ``known_fingerprint`` a page whose normalized content still has
+        that fingerprint is not parsed and ``{'unchanged': True}`` is returned.
+        """
         try:
-            # Look for common patterns
-            text = container.get_text()
-            
-            # Pattern: "Label: Value"
-            if ':' in text:
-                parts = text.split(':')
-                if len(parts) >= 2:
-                    return parts[1].strip()
-            
-            # Pattern: "Label Value" (look for next sibling or child)
-            strong_elem = container.find('strong')
-            if strong_elem:
-                next_text = strong_elem.next_sibling
-                if next_text and hasattr(next_text, 'strip'):
-                    return next_text.strip()
-            
-            return text.strip()
+            # Same fetch and extraction as the pipeline, so discontinued
+            # markers are looked for in the whole page
+            fetched = self.fetcher.fetch_markup(
+                url,
+                skip_unchanged=skip_unchanged,
+                known_fingerprint=known_fingerprint
+            )
+            return self.parse_product({'url': url}, fetched)
             
-        except:
-            return ""
+        except Exception as e:
+            logger.error(f"Error scraping product page {url}: {e}")
+            return None
+    
+    def extract_product_data(self, soup, url, markup=None):
+        """Extract the product fields from a parsed product page (see ``extract_fields``)"""
+        product_data, details = extract_fields(
+            soup, url, self.selectors.orders(), tuple(self.discontinued_image_urls), markup=markup
+        )
+        self.apply_extraction_details(url, details)
+        return product_data
+    
+    def extract_markup(self, url, markup):
+        """Parse and extract one page in the extraction pool; returns (product_data, complete)"""
+        args = (markup, url, self.selectors.orders(), tuple(self.discontinued_image_urls))
+        if self.extract_workers:
+            result = self.extract_pool().submit(extract_product, *args).result()
+        else:
+            result = extract_product(*args)
+        self.fetcher.record_parse(result['parse_seconds'])
+        self.apply_extraction_details(url, result['details'])
+        return result['product'], result['complete']
+    
+    def extract_pool(self):
+        if self._extract_pool is None:
+            self._extract_pool = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=pool_context(),
+                initializer=exit_with_parent,
+                initargs=(os.getpid(),)
+            )
+            # Start the worker processes now, before the stage threads need them
+            self._extract_pool.submit(os.getpid).result()
+        return self._extract_pool
+    
+    def close_extract_pool(self):
+        if self._extract_pool is not None:
+            self._extract_pool.shutdown(wait=True, cancel_futures=True)
+            self._extract_pool = None
+    
+    def apply_extraction_details(self, url, details):
+        """Record selector wins and log discontinued evidence found by an extraction"""
+        for field, (winner, calls) in details['selectors'].items():
+            self.selectors.record(field, winner, calls)
+        
+        if details['evidence']:
+            logger.info(
+                "Discontinued product detected - "
+                + ', '.join(f"{kind} contains: {pattern}" for kind, pattern in details['evidence'][:5])
+            )
+            logger.warning(f"Product at {url} detected as DISCONTINUED")
+        elif details['discontinued_image']:
+            logger.warning(f"Product marked as discontinued due to image: {details['discontinued_image']}")
+    
+    def discover_products(self, categories):
+        """Find product links in the sitemaps, falling back to browser search pages"""
+        discovery = SitemapDiscovery(
+            self.session, self.base_url, categories,
+            rate_limiter=self.rate_limiter,
+            resilience=self.resilience
+        )
+        products = list(discovery.discover())
+        self.metrics.count_bytes(discovery.stats['bytes'])
+        if products:
+            logger.info(f"Found {len(products)} products in {discovery.stats['sitemaps']} sitemaps")
+            return products
+        
+        # The search pages list every category at once, so render them once
+        # and classify the links by URL instead of once per category
+        logger.info("No products found in sitemaps, falling back to browser search...")
+        products = self.search_products()
+        for product in products:
+            category = discovery.classifier.category(product['url'])
+            product['category'] = category['name'] if category else 'General'
+        return products
     
     def search_products(self, category_keyword=""):
         """Search for products using the site's search functionality"""
         try:
-            if not self.driver:
-                self.setup_driver()
-            
             # Try different search URLs
             search_urls = [
                 f"{self.base_url}/productos",
@@ -306,12 +477,12 @@ class RalphWilsonScraper:
             
             for search_url in search_urls:
                 try:
-                    self.driver.get(search_url)
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    page_source = self.resilience.call(
+                        'browser', search_url,
+                        lambda timeout: self._render_once(search_url, timeout)
                     )
                     
-                    soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                    soup = parse_links(page_source)
                     
                     # Look for product links
                     product_links = soup.find_all('a', href=re.compile(r'/producto|/product|/laminado|/cuarzo', re.I))
@@ -352,156 +523,444 @@ class RalphWilsonScraper:
         """Main scraping function with discontinued product detection"""
         if self.app:
             with self.app.app_context():
-                # Create scraping log
-                log = ScrapingLog(status='running')
-                db.session.add(log)
-                db.session.commit()
+                checkpoint = RunCheckpoint(self.checkpoint_path) if self.checkpoint_path else None
+                # Create scraping log (or take over the interrupted run we hold a checkpoint for)
+                log, resuming = self.start_log(checkpoint)
+                if checkpoint and not resuming and checkpoint.log_id():
+                    owner = db.session.get(ScrapingLog, checkpoint.log_id())
+                    if owner is not None and owner.status == 'running':
+                        # Another live run owns the checkpoint; run without one
+                        checkpoint.close()
+                        checkpoint = None
+                frontier = None
+                # Keeps the run alive for recover_stale_runs during long phases
+                heartbeat = RunHeartbeat(self.app, log.id).start()
                 
                 try:
                     logger.info("Starting product scraping with discontinued detection...")
+                    self.metrics.start()
+                    self.report_step('Buscando categorías')
                     
-                    # Get categories
-                    categories = self.get_product_categories()
-                    logger.info(f"Found {len(categories)} categories")
+                    # Process each product
+                    processed_count = (log.products_scraped or 0) if resuming else 0
+                    updated_count = 0
+                    discontinued_count = 0
+                    unchanged_count = 0
+                    missing_count = 0
+                    handled_count = 0
                     
-                    all_products = []
+                    known_names = self.load_known_products()
+                    self.writer.preload()
+                    self.metrics.lap('setup')
                     
-                    # Search for products in each category
-                    for category in categories:
-                        logger.info(f"Scraping category: {category['name']}")
-                        products = self.search_products(category['keyword'])
+                    # Each canonical product URL is queued at most once per run,
+                    # products we don't have yet before re-checks of known ones
+                    frontier = CrawlFrontier(self.frontier_path)
+                    replay = []
+                    
+                    if resuming:
+                        # Pick up where the interrupted run stopped: finished
+                        # results are re-applied (idempotently), the rest fetched
+                        done = checkpoint.done()
+                        for product_info, result in done:
+                            frontier.mark_seen(product_info['url'])
+                            if result:
+                                replay.append((product_info, result, None))
+                        for product_info, priority in checkpoint.pending():
+                            frontier.add(product_info, priority)
+                        logger.info(f"Resuming run {log.id}: {len(done)} pages already done, {len(frontier)} pending")
+                    else:
+                        # Get categories
+                        categories = self.get_product_categories()
+                        logger.info(f"Found {len(categories)} categories")
+                        self.report_step('Descubriendo productos')
                         
-                        for product in products:
-                            product['category'] = category['name']
-                            all_products.append(product)
+                        all_products = self.discover_products(categories)
                         
-                        time.sleep(2)  # Be respectful to the server
-                    
-                    # If no categories found, do a general search
-                    if not all_products:
-                        logger.info("No categories found, doing general search...")
-                        general_products = self.search_products()
-                        all_products.extend(general_products)
+                        logger.info(f"Found {len(all_products)} products to process")
+                        
+                        listed_urls = set()
+                        already_stored = 0
+                        for product_info in all_products:
+                            url = canonicalize_url(product_info['url'])
+                            listed_urls.add(url)
+                            if not self.incremental:
+                                # Skip products we already have (and duplicate names in this run)
+                                if url in self.known_product_ids or product_info['name'] in known_names:
+                                    already_stored += 1
+                                    continue
+                                known_names.add(product_info['name'])
+                            frontier.add(product_info, priority=0 if url in self.known_product_ids else 1)
+                        
+                        if self.incremental:
+                            # Every listed product is re-checked; unchanged pages cost
+                            # one HTTP fetch and no parse or DB write
+                            missing_count = self.mark_listing_presence(listed_urls)
+                        if already_stored:
+                            logger.info(f"Skipping {already_stored} listed products that already exist")
+                        if frontier.duplicates:
+                            logger.info(f"Dropped {frontier.duplicates} duplicate product URLs")
+                        
+                        if checkpoint:
+                            checkpoint.start(log.id, frontier.queued(), incremental=self.incremental)
                     
-                    logger.info(f"Found {len(all_products)} products to process")
+                    self.heartbeat(log, processed_count)
+                    self.metrics.lap('discover')
+                    if self.progress:
+                        self.progress.set_total(len(frontier) + len(replay))
+                    logger.info(f"Fetching {len(frontier)} product pages with {self.max_workers} workers")
                     
-                    # Process each product
-                    processed_count = 0
-                    discontinued_count = 0
+                    # Fetch, parse and image stages run in their own threads;
+                    # results are written here as they leave the pipeline
+                    self.pipeline = self.build_pipeline()
                     
-                    for product_info in all_products:
+                    for product_info, result, error in itertools.chain(replay, self.pipeline.run(frontier)):
                         try:
-                            # Check if product already exists
-                            existing = Product.query.filter_by(
-                                name=product_info['name']
-                            ).first()
+                            handled_count += 1
+                            # Failed pages stay pending so a resumed run retries them
+                            if checkpoint and not error and result:
+                                checkpoint.record(product_info['url'], result)
                             
-                            if existing:
-                                logger.info(f"Product already exists: {product_info['name']}")
+                            if error or not result:
                                 continue
+                            frontier.mark_done(product_info['url'])
                             
-                            # Scrape detailed product information
-                            detailed_data = self.scrape_product_page(product_info['url'])
+                            detailed_data = result
                             
-                            if detailed_data:
-                                # Download and save image (even for discontinued products)
-                                local_image_path = None
-                                if detailed_data.get('image_url'):
-                                    local_image_path = self.download_image(
-                                        detailed_data['image_url'],
-                                        product_info['name']
-                                    )
-                                
-                                # Create product record
-                                product = Product(
-                                    name=detailed_data['name'] or product_info['name'],
-                                    category=product_info['category'],
-                                    description=detailed_data['description'],
-                                    image_url=detailed_data['image_url'],
-                                    local_image_path=local_image_path,
-                                    product_url=product_info['url'],
-                                    design_group=detailed_data['design_group'],
-                                    color_group=detailed_data['color_group'],
-                                    finish=detailed_data['finish'],
-                                    dimensions=detailed_data['dimensions'],
-                                    material_code=detailed_data['material_code'],
-                                    surface_type=product_info['category'],
-                                    discontinued=detailed_data.get('discontinued', False)
-                                )
-                                
-                                db.session.add(product)
-                                processed_count += 1
-                                
-                                if detailed_data.get('discontinued'):
-                                    discontinued_count += 1
-                                    logger.info(f"DISCONTINUED product added: {product.name}")
-                                
-                                if processed_count % 10 == 0:
-                                    db.session.commit()
-                                    logger.info(f"Processed {processed_count} products ({discontinued_count} discontinued)")
+                            if detailed_data.get('not_modified') or detailed_data.get('unchanged'):
+                                unchanged_count += 1
+                                continue
                             
-                            time.sleep(1)  # Rate limiting
+                            if not self.incremental and product_info['url'] in self.known_product_ids:
+                                # Written before an interruption; nothing to do
+                                continue
+                            
+                            # Replayed results are upserted again; rows already
+                            # stored come back as unchanged
+                            fields = self.build_product_fields(
+                                product_info, detailed_data, detailed_data.get('local_image_path')
+                            )
+                            outcome = self.writer.add(fields)
+                            if outcome == 'unchanged':
+                                unchanged_count += 1
+                                continue
+                            if outcome == 'updated':
+                                updated_count += 1
+                            processed_count += 1
+                            
+                            if detailed_data.get('discontinued'):
+                                discontinued_count += 1
+                                logger.info(f"DISCONTINUED product added: {fields['name']}")
                             
                         except Exception as e:
                             logger.error(f"Error processing product {product_info['name']}: {e}")
-                            continue
+                        
+                        finally:
+                            if self.progress:
+                                self.progress.item(product_info['name'], bool(result and result.get('discontinued')))
+                            # Once per write batch the rows and the log's progress are
+                            # committed in one transaction, then the checkpoint and
+                            # frontier; a crash loses only unsynced pages, which a
+                            # resumed run fetches again without counting them twice
+                            if handled_count % self.writer.batch_size == 0:
+                                self.heartbeat(log, processed_count, commit=False)
+                                self.writer.flush()
+                                db.session.commit()
+                                if checkpoint:
+                                    checkpoint.flush()
+                                frontier.commit()
+                                logger.info(f"Processed {processed_count} products ({discontinued_count} discontinued)")
                     
-                    # Final commit
+                    # Products committed before an interruption may still lack images
+                    image_jobs = self.resubmit_missing_images() if resuming else []
+                    
+                    # Wait for the image stage to drain, then write the last batch
+                    self.report_step('Descargando imágenes')
+                    self.images.close()
+                    self.apply_image_results(image_jobs, wait=True)
+                    self.heartbeat(log, processed_count, commit=False)
+                    self.writer.flush()
                     db.session.commit()
+                    if checkpoint:
+                        checkpoint.finish()
+                    frontier.reset()
+                    self.metrics.lap('pipeline')
+                    self.report_step('Generando miniaturas')
+                    self.update_image_derivatives()
+                    self.metrics.lap('derivatives')
+                    self.log_pipeline_report()
+                    self.log_fetch_report()
+                    self.log_cache_report()
+                    self.log_rate_report()
+                    self.log_selector_report()
+                    self.log_write_report()
+                    if unchanged_count:
+                        logger.info(f"Skipped {unchanged_count} unchanged product pages")
+                    if self.incremental:
+                        logger.info(
+                            f"Incremental run: {processed_count - updated_count} new, {updated_count} updated, "
+                            f"{unchanged_count} unchanged, {missing_count} missing from listings"
+                        )
                     
                     # Update log
                     log.end_time = datetime.utcnow()
                     log.status = 'completed'
                     log.products_scraped = processed_count
+                    self.record_resilience(log)
                     if discontinued_count > 0:
                         log.errors = f"Found {discontinued_count} discontinued products out of {processed_count} total"
                     db.session.commit()
+                    self.record_run_metrics(log, {
+                        'new': processed_count - updated_count, 'updated': updated_count,
+                        'unchanged': unchanged_count, 'discontinued': discontinued_count,
+                        'missing': missing_count
+                    })
+                    refresh_suggest_index()
+                    if self.progress:
+                        self.progress.finish('completed', result={
+                            'log_id': log.id, 'products_scraped': processed_count, 'updated': updated_count,
+                            'unchanged': unchanged_count, 'discontinued': discontinued_count
+                        })
                     
                     logger.info(f"Scraping completed. Processed {processed_count} products ({discontinued_count} discontinued)")
                     return processed_count
                     
                 except Exception as e:
                     logger.error(f"Scraping failed: {e}")
+                    db.session.rollback()
                     log.status = 'failed'
                     log.errors = str(e)
+                    self.record_resilience(log)
                     log.end_time = datetime.utcnow()
                     db.session.commit()
+                    self.record_run_metrics(log, {
+                        'new': processed_count - updated_count, 'updated': updated_count,
+                        'unchanged': unchanged_count, 'discontinued': discontinued_count,
+                        'missing': missing_count
+                    })
+                    refresh_suggest_index()
+                    if self.progress:
+                        self.progress.finish('failed', result={'log_id': log.id}, error=str(e))
                     return 0
                     
                 finally:
+                    heartbeat.stop()
+                    # The checkpoint is kept after a failure so the next run can resume
+                    if self.pipeline:
+                        self.pipeline.close()
+                    self.close_extract_pool()
+                    if checkpoint:
+                        checkpoint.flush()
+                        checkpoint.close()
+                    if frontier:
+                        frontier.close()
+                    self.images.close()
                     self.close_driver()
     
-    def download_image(self, image_url, product_name):
-        """Download and save product image"""
-        try:
-            if not image_url:
-                return None
-            
-            # Create images directory if it doesn't exist
-            images_dir = os.path.join('static', 'images', 'products')
-            os.makedirs(images_dir, exist_ok=True)
-            
-            # Generate filename
-            safe_name = re.sub(r'[^\w\-_\.]', '_', product_name.lower())
-            extension = os.path.splitext(urlparse(image_url).path)[1] or '.jpg'
-            filename = f"{safe_name}{extension}"
-            filepath = os.path.join(images_dir, filename)
-            
-            # Download image
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            return f"images/products/{filename}"
-            
-        except Exception as e:
-            logger.error(f"Error downloading image {image_url}: {e}")
+    def start_log(self, checkpoint=None):
+        """Return (log, resuming): a new running log, or the interrupted one we hold a checkpoint for"""
+        recover_stale_runs()
+        log = None
+        log_id = checkpoint.log_id() if checkpoint else None
+        if log_id:
+            log = db.session.get(ScrapingLog, log_id)
+        
+        resuming = log is not None and log.status in ('interrupted', 'failed') and bool(checkpoint.counts())
+        if resuming:
+            logger.info(f"Taking over {log.status} scraping run {log.id}")
+            log.end_time = None
+        else:
+            log = ScrapingLog()
+            db.session.add(log)
+        log.status = 'running'
+        log.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        return log, resuming
+    
+    def heartbeat(self, log, processed_count, commit=True):
+        """Record progress and mark the run as alive (``commit=False`` leaves the commit to the caller)"""
+        log.heartbeat_at = datetime.utcnow()
+        log.products_scraped = processed_count
+        if commit:
+            db.session.commit()
+    
+    def load_known_products(self):
+        """Load stored URLs, ids and fingerprints in one query; returns the stored names"""
+        known = db.session.query(
+            Product.product_url, Product.id, Product.content_fingerprint, Product.name
+        ).all()
+        self.known_product_ids = {}
+        self.known_fingerprints = {}
+        known_names = set()
+        for url, product_id, fingerprint, name in known:
+            known_names.add(name)
+            if url:
+                self.known_product_ids[canonicalize_url(url)] = product_id
+                self.known_fingerprints[canonicalize_url(url)] = fingerprint
+        return known_names
+    
+    def resubmit_missing_images(self):
+        """Queue downloads for stored products that have an image URL but no local image"""
+        products = db.session.query(Product.product_url, Product.image_url).filter(
+            Product.local_image_path.is_(None), Product.product_url.isnot(None),
+            Product.image_url.isnot(None), Product.image_url != ''
+        ).all()
+        return [(product_url, self.images.submit(image_url)) for product_url, image_url in products]
+    
+    def build_product_fields(self, product_info, detailed_data, local_image_path):
+        """Map listing info plus scraped page data onto Product columns"""
+        return {
+            'name': detailed_data['name'] or product_info['name'],
+            'category': product_info['category'],
+            'description': detailed_data['description'],
+            'image_url': detailed_data['image_url'],
+            'local_image_path': local_image_path,
+            'product_url': product_info['url'],
+            'design_group': detailed_data['design_group'],
+            'color_group': detailed_data['color_group'],
+            'finish': detailed_data['finish'],
+            'dimensions': detailed_data['dimensions'],
+            'material_code': detailed_data['material_code'],
+            'surface_type': product_info['category'],
+            'discontinued': detailed_data.get('discontinued', False),
+            'content_fingerprint': detailed_data.get('fingerprint'),
+            'last_seen_at': datetime.utcnow(),
+            'missing_from_listing': False
+        }
+    
+    def mark_listing_presence(self, listed_urls, chunk_size=500):
+        """Flag stored products as seen in / missing from this run's listings
+        
+        Returns the number of products missing from the listings. Nothing is
+        marked when discovery found no products at all, so a failed listing
+        crawl cannot flag the whole catalog as missing.
+        """
+        if not listed_urls:
+            logger.warning("No products listed; not marking any product as missing")
+            return 0
+        
+        now = datetime.utcnow()
+        seen = [product_id for url, product_id in self.known_product_ids.items() if url in listed_urls]
+        missing = [product_id for url, product_id in self.known_product_ids.items() if url not in listed_urls]
+        
+        for i in range(0, len(seen), chunk_size):
+            Product.query.filter(Product.id.in_(seen[i:i + chunk_size])).update(
+                {'last_seen_at': now, 'missing_from_listing': False},
+                synchronize_session=False
+            )
+        for i in range(0, len(missing), chunk_size):
+            Product.query.filter(Product.id.in_(missing[i:i + chunk_size])).update(
+                {'missing_from_listing': True},
+                synchronize_session=False
+            )
+        db.session.commit()
+        
+        if missing:
+            logger.info(f"{len(missing)} stored products are missing from the listings")
+        return len(missing)
+    
+    def build_pipeline(self):
+        """Fetch -> parse -> images stages; the caller of run() is the write stage"""
+        # Parse threads mostly wait on the extraction pool: one per process
+        parse_workers = self.parse_workers or max(1, self.extract_workers)
+        if self.extract_workers:
+            self.extract_pool()
+        return ScrapePipeline([
+            Stage('fetch', self.fetch_product, workers=self.max_workers, queue_size=self.pipeline_queue_size),
+            Stage('parse', self.parse_product, workers=parse_workers, queue_size=self.pipeline_queue_size),
+            Stage('images', self.download_product_image, workers=self.images.max_workers,
+                  queue_size=self.pipeline_queue_size),
+        ], output_size=self.pipeline_queue_size)
+    
+    def fetch_product(self, product_info, _=None):
+        """Fetch stage: download one product page, returning a FetchResult with its markup"""
+        url = product_info['url']
+        if self.incremental:
+            return self.fetcher.fetch_markup(url, known_fingerprint=self.known_fingerprints.get(url) or '')
+        return self.fetcher.fetch_markup(url, skip_unchanged=url in self.known_product_ids)
+    
+    def parse_product(self, product_info, fetched):
+        """Parse stage: extract the product data from a fetched page
+        
+        HTTP pages missing the markup we need are rendered with the browser
+        here and extracted again.
+        """
+        url = product_info['url']
+        markup, tier, fingerprint = fetched
+        if tier == 'not_modified':
+            return {'not_modified': True}
+        if tier == 'unchanged':
+            return {'unchanged': True, 'fingerprint': fingerprint}
+        if markup is None:
+            return None
+        
+        product_data, complete = self.extract_markup(url, markup)
+        if tier == 'http':
+            self.fetcher.verified(url, complete)
+            if not complete:
+                markup, tier, fingerprint = self.fetcher.render(url, fingerprint)
+                if markup is None:
+                    return None
+                product_data, _ = self.extract_markup(url, markup)
+        
+        product_data['fingerprint'] = fingerprint
+        return product_data
+    
+    def download_product_image(self, product_info, result):
+        """Image stage: download the product image (even for discontinued products)"""
+        if result and result.get('image_url'):
+            result['local_image_path'] = self.images.submit(result['image_url']).result()
+        return result
+    
+    def apply_image_results(self, image_jobs, wait=False):
+        """Hand finished image downloads to the writer; returns jobs still running"""
+        remaining = []
+        for product_url, future in image_jobs:
+            if wait or future.done():
+                local_image_path = future.result()
+                if local_image_path:
+                    self.writer.set_image_path(product_url, local_image_path)
+            else:
+                remaining.append((product_url, future))
+        return remaining
+    
+    def update_image_derivatives(self):
+        """Generate missing thumbnails/WebP variants and record them on products
+        
+        Covers every stored product with a local image, so images downloaded
+        by earlier runs are backfilled; existing derivatives are not redone.
+        """
+        rows = db.session.query(
+            Product.id, Product.local_image_path, Product.thumbnail_path
+        ).filter(Product.local_image_path.isnot(None)).all()
+        
+        stale = [
+            (product_id, local_image_path) for product_id, local_image_path, thumbnail_path in rows
+            if thumbnail_path != derivative_paths(local_image_path)['thumbnail_path']
+            or not self.derivatives.is_complete(local_image_path)
+        ]
+        if not stale:
+            return 0
+        
+        results = self.derivatives.generate(path for _, path in stale)
+        updates = [
+            dict(id=product_id, **results[local_image_path])
+            for product_id, local_image_path in stale if local_image_path in results
+        ]
+        if updates:
+            db.session.execute(update(Product), updates)
+            db.session.commit()
+            logger.info(f"Recorded image derivatives for {len(updates)} products")
+        return len(updates)
+    
+    def download_image(self, image_url, product_name=None):
+        """Download and save a product image, returning its static-relative path"""
+        if not image_url:
             return None
+        return self.images.download(image_url)
 
 
-def run_scraper(app):
+def run_scraper(app, max_workers=4, incremental=False):
     """Function to run the scraper"""
-    scraper = RalphWilsonScraper(app)
+    scraper = RalphWilsonScraper(app, max_workers=max_workers, incremental=incremental)
     return scraper.scrape_all_products()
@@ -0,0 +1,144 @@
+import os
+import json
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveSelectors:
+    """Per-field CSS selector lists tried in order of past wins
+
+    Each field (e.g. 'name') has a list of selectors in priority order. The
+    selector that produced the field's value on a page gets a win, and
+    selectors are tried most-wins-first (ties keep the configured order),
+    so a page usually costs one ``select_one`` per field. Selectors in
+    ``fixed`` are generic fallbacks (e.g. a bare ``h1``) that also match
+    the elements of more specific ones: they keep their configured position
+    and the others are only reordered between them, so a fallback never
+    takes precedence over a selector configured before it. Win counts are
+    halved once a field passes ``window`` wins, so a site layout change is
+    picked up within a few hundred pages. Counts persist in ``stats_path``.
+    """
+
+    def __init__(self, fields, stats_path=os.path.join('instance', 'selector_stats.json'), window=1000, fixed=None):
+        self.fields = {field: list(selectors) for field, selectors in fields.items()}
+        self.fixed = {field: set((fixed or {}).get(field, ())) for field in self.fields}
+        self.stats_path = stats_path
+        self.window = window
+
+        self._lock = threading.Lock()
+        self.wins = {field: dict.fromkeys(selectors, 0.0) for field, selectors in self.fields.items()}
+        self._load()
+        self._orders = {field: self._rank(field) for field in self.fields}
+        self.run_stats = {field: {'pages': 0, 'select_calls': 0, 'misses': 0} for field in self.fields}
+
+    def ordered(self, field):
+        with self._lock:
+            return self._orders[field]
+
+    def select(self, soup, field, accept=None):
+        """Return the first element matched by the field's selectors (or None)
+
+        ``accept(element)`` can reject a match (e.g. an <img> without src);
+        the next selector is then tried.
+        """
+        calls = 0
+        winner = None
+        element = None
+        for selector in self.ordered(field):
+            calls += 1
+            candidate = soup.select_one(selector)
+            if candidate is not None and (accept is None or accept(candidate)):
+                winner, element = selector, candidate
+                break
+
+        self.record(field, winner, calls)
+        return element
+
+    def orders(self):
+        """Current selector order for every field (a snapshot, safe to pickle)"""
+        with self._lock:
+            return {field: list(order) for field, order in self._orders.items()}
+
+    def record(self, field, winner, calls):
+        """Count one page whose selection ran elsewhere (e.g. in a worker process)
+
+        ``winner`` is the selector that matched (None for a miss) after
+        ``calls`` select_one calls.
+        """
+        with self._lock:
+            stats = self.run_stats[field]
+            stats['pages'] += 1
+            stats['select_calls'] += calls
+            if winner is None:
+                stats['misses'] += 1
+            elif winner in self.wins[field]:
+                self._win(field, winner)
+
+    def matches_any(self, soup, field):
+        """True if any of the field's selectors matches (no stats recorded)"""
+        return any(soup.select_one(selector) is not None for selector in self.ordered(field))
+
+    def report(self):
+        """Per-field select_one calls per page this run, misses and current order"""
+        with self._lock:
+            return {
+                field: dict(
+                    stats,
+                    calls_per_page=round(stats['select_calls'] / stats['pages'], 2) if stats['pages'] else 0.0,
+                    order=[(selector, round(self.wins[field][selector], 1)) for selector in self._orders[field]],
+                )
+                for field, stats in self.run_stats.items()
+            }
+
+    def save(self):
+        with self._lock:
+            data = {field: dict(wins) for field, wins in self.wins.items()}
+        try:
+            os.makedirs(os.path.dirname(self.stats_path) or '.', exist_ok=True)
+            tmp_path = f"{self.stats_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            logger.error(f"Error saving selector stats: {e}")
+
+    def _win(self, field, selector):
+        wins = self.wins[field]
+        wins[selector] += 1
+        if sum(wins.values()) > self.window:
+            for key in wins:
+                wins[key] /= 2
+        order = self._orders[field]
+        # Only re-rank when the winner now outranks an earlier selector
+        position = order.index(selector)
+        if position and wins[selector] > wins[order[position - 1]]:
+            self._orders[field] = self._rank(field)
+
+    def _rank(self, field):
+        selectors = self.fields[field]
+        wins = self.wins[field]
+        fixed = self.fixed[field]
+        order, segment = [], []
+        for selector in selectors + [None]:
+            if selector is None or selector in fixed:
+                order.extend(sorted(segment, key=lambda s: (-wins[s], selectors.index(s))))
+                segment = []
+                if selector is not None:
+                    order.append(selector)
+            else:
+                segment.append(selector)
+        return order
+
+    def _load(self):
+        try:
+            with open(self.stats_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Selectors no longer configured are dropped, new ones start at zero
+        for field, wins in self.wins.items():
+            for selector, count in saved.get(field, {}).items():
+                if selector in wins:
+                    wins[selector] = float(count)
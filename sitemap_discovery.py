@@ -0,0 +1,166 @@
+import io
+import re
+import gzip
+import logging
+from collections import deque
+from urllib.parse import urljoin, urlparse, unquote
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_URL_RE = re.compile(r'/producto|/product|/laminado|/cuarzo', re.I)
+LISTING_PATHS = {'/productos', '/producto', '/products', '/product', '/catalog'}
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+IMAGE_NS = '{http://www.google.com/schemas/sitemap-image/1.1}'
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class UrlClassifier:
+    """Assign product URLs to categories by keyword in the URL path
+
+    ``/productos/laminados/7927-60`` -> the 'laminados' category. Keywords
+    also match their singular form (``/laminado-7927-60.html``); longer
+    keywords win. All keywords are matched with one compiled regex.
+    """
+
+    def __init__(self, categories):
+        self.by_keyword = {}
+        for category in categories:
+            keyword = category['keyword'].lower()
+            self.by_keyword.setdefault(keyword, category)
+            self.by_keyword.setdefault(keyword.rstrip('s'), category)
+        alternatives = sorted(self.by_keyword, key=len, reverse=True)
+        self.keyword_re = re.compile('|'.join(re.escape(k) for k in alternatives)) if alternatives else None
+        # Category landing pages (/productos/laminados) are not products
+        self.landing_paths = LISTING_PATHS | {
+            urlparse(category['url']).path.rstrip('/').lower() for category in categories
+        }
+
+    def category(self, url):
+        return self._category(unquote(urlparse(url).path).lower())
+
+    def classify(self, url):
+        """Return (is_product_url, category or None) for ``url``"""
+        path = unquote(urlparse(url).path).rstrip('/').lower()
+        if not path or path in self.landing_paths:
+            return False, None
+        category = self._category(path)
+        return category is not None or PRODUCT_URL_RE.search(path) is not None, category
+
+    def _category(self, path):
+        found = self.keyword_re.search(path) if self.keyword_re else None
+        return self.by_keyword[found.group()] if found else None
+
+
+def name_from_url(url):
+    """'/productos/laminados/gris-nube-7927-60.html' -> 'Gris Nube 7927 60'"""
+    slug = unquote(urlparse(url).path.rstrip('/').rsplit('/', 1)[-1])
+    slug = re.sub(r'\.(html?|php|aspx?)$', '', slug, flags=re.I)
+    return re.sub(r'[-_]+', ' ', slug).strip().title()
+
+
+class SitemapDiscovery:
+    """Discover product URLs from robots.txt / sitemap.xml over plain HTTP
+
+    Sitemap indexes are followed breadth-first (each sitemap once, at most
+    ``max_sitemaps``). Documents are streamed through lxml's iterparse, so a
+    50k-URL sitemap is never held in memory, and gzipped sitemaps are
+    decompressed on the fly. Only URLs that look like product pages are
+    yielded, already classified into the given categories.
+    """
+
+    def __init__(self, session, base_url, categories, rate_limiter=None, resilience=None,
+                 max_sitemaps=50, timeout=30):
+        self.session = session
+        self.base_url = base_url
+        self.classifier = UrlClassifier(categories)
+        self.rate_limiter = rate_limiter
+        self.resilience = resilience
+        self.max_sitemaps = max_sitemaps
+        self.timeout = timeout
+        self.stats = {'sitemaps': 0, 'urls': 0, 'products': 0, 'errors': 0, 'bytes': 0}
+
+    def discover(self):
+        """Yield product info dicts ({'name', 'url', 'category'}) found in the sitemaps"""
+        queue = deque(self.sitemap_urls())
+        seen = set(queue)
+
+        while queue and self.stats['sitemaps'] < self.max_sitemaps:
+            sitemap_url = queue.popleft()
+            self.stats['sitemaps'] += 1
+            try:
+                for kind, loc, title in self._entries(sitemap_url):
+                    if kind == 'sitemap':
+                        if loc not in seen:
+                            seen.add(loc)
+                            queue.append(loc)
+                        continue
+
+                    self.stats['urls'] += 1
+                    is_product, category = self.classifier.classify(loc)
+                    if not is_product:
+                        continue
+                    self.stats['products'] += 1
+                    yield {
+                        'name': title or name_from_url(loc),
+                        'url': loc,
+                        'category': category['name'] if category else 'General'
+                    }
+            except Exception as e:
+                logger.warning(f"Error reading sitemap {sitemap_url}: {e}")
+                self.stats['errors'] += 1
+
+        logger.info(f"Sitemap discovery: {self.stats}")
+
+    def sitemap_urls(self):
+        """Sitemaps listed in robots.txt, or /sitemap.xml"""
+        robots_url = urljoin(self.base_url, '/robots.txt')
+        sitemaps = []
+        try:
+            response = self._get(robots_url, stream=False)
+            if response.status_code == 200:
+                for line in response.text.splitlines():
+                    if line.lower().startswith('sitemap:'):
+                        sitemaps.append(line.split(':', 1)[1].strip())
+        except Exception as e:
+            logger.warning(f"Could not read {robots_url}: {e}")
+        return sitemaps or [urljoin(self.base_url, '/sitemap.xml')]
+
+    def _get(self, url, stream=True):
+        def get_once(timeout):
+            if self.rate_limiter:
+                self.rate_limiter.wait(url)
+            return self.session.get(url, timeout=timeout, stream=stream)
+
+        if self.resilience:
+            return self.resilience.call('sitemap', url, get_once)
+        return get_once(self.timeout)
+
+    def _entries(self, sitemap_url):
+        """Stream (kind, loc, title) tuples from one sitemap or sitemap index"""
+        response = self._get(sitemap_url)
+        try:
+            response.raise_for_status()
+            # urllib3 undoes any Content-Encoding; a .gz file served without
+            # one still starts with the gzip magic bytes and is unpacked here
+            response.raw.decode_content = True
+            stream = io.BufferedReader(response.raw)
+            if stream.peek(2)[:2] == GZIP_MAGIC:
+                stream = gzip.GzipFile(fileobj=stream)
+
+            for _, element in etree.iterparse(stream, events=('end',), tag=(f'{SITEMAP_NS}url', f'{SITEMAP_NS}sitemap')):
+                loc = element.findtext(f'{SITEMAP_NS}loc')
+                if loc:
+                    if element.tag == f'{SITEMAP_NS}sitemap':
+                        yield 'sitemap', loc.strip(), None
+                    else:
+                        title = element.findtext(f'{IMAGE_NS}image/{IMAGE_NS}title')
+                        yield 'url', loc.strip(), title.strip() if title else None
+                # Free what has been parsed so memory stays flat
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        finally:
+            # Bytes read off the wire (streamed responses bypass the HTTP cache)
+            self.stats['bytes'] += response.raw.tell()
+            response.close()
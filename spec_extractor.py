@@ -0,0 +1,100 @@
+import re
+import unicodedata
+from bs4 import Tag
+
+SPEC_CONTAINER_RE = re.compile(r'spec|detail|info', re.I)
+
+# Normalized (lowercase, accent-free) labels for each Product spec field
+FIELD_LABELS = {
+    'design_group': ['grupo de diseno', 'grupo diseno', 'design group'],
+    'color_group': ['grupo de color', 'grupo color', 'color group'],
+    'finish': ['acabado', 'acabados', 'finish', 'finishes', 'textura', 'texture'],
+    'dimensions': ['dimension', 'dimensiones', 'dimensions', 'medidas', 'tamano', 'tamanos', 'size', 'sizes'],
+    'material_code': ['codigo', 'codigo de material', 'material code', 'code', 'clave', 'sku',
+                      'numero de producto', 'product number'],
+}
+LABEL_TO_FIELD = {label: field for field, labels in FIELD_LABELS.items() for label in labels}
+
+# Longer "labels" are sentences, not spec labels
+MAX_LABEL_LENGTH = 40
+
+
+def fold_accents(text):
+    """'Código' -> 'Codigo'"""
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def normalize_label(text):
+    """'  Grupo de Diseño: ' -> 'grupo de diseno'"""
+    return ' '.join(fold_accents(text).lower().replace(':', ' ').split())
+
+
+def find_spec_regions(soup):
+    """Outermost div/section elements whose class looks like a spec block
+
+    Matching subtrees are not descended into, so nested spec containers
+    are covered by their outermost ancestor and each node is visited once.
+    """
+    regions = []
+    stack = [soup]
+    while stack:
+        node = stack.pop()
+        classes = node.get('class') if node.name in ('div', 'section') else None
+        if classes and SPEC_CONTAINER_RE.search(' '.join(classes) if isinstance(classes, list) else classes):
+            regions.append(node)
+            continue
+        stack.extend(child for child in reversed(node.contents) if isinstance(child, Tag))
+    return regions
+
+
+def _is_label(token):
+    """Whether a whole string is a known spec label
+
+    Only known labels count: a value that merely ends in ':' ("Brand:
+    Finish:") must not be mistaken for the next label.
+    """
+    return normalize_label(token) in LABEL_TO_FIELD
+
+
+def extract_specs(soup):
+    """Build a normalized label -> value map from the page's spec regions
+
+    Each region's text is read once as a stream of strings. Handles
+    ``Label: value`` in one string, and ``<strong>Label:</strong> value``,
+    ``<th>Label</th><td>value</td>`` and ``<dt>Label</dt><dd>value</dd>``
+    for the labels in FIELD_LABELS. The first value seen for a label wins.
+    """
+    specs = {}
+    for region in find_spec_regions(soup):
+        tokens = list(region.stripped_strings)
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            label, value = None, None
+
+            if _is_label(token):
+                # Label in its own element: the value is the next string
+                label = normalize_label(token)
+                if i + 1 < len(tokens) and not _is_label(tokens[i + 1]):
+                    value = tokens[i + 1]
+                    i += 1
+            elif ':' in token:
+                head, _, tail = token.partition(':')
+                head_label = normalize_label(head)
+                if 0 < len(head_label) <= MAX_LABEL_LENGTH and tail.strip():
+                    label, value = head_label, tail.strip()
+
+            if label and value and label not in specs:
+                specs[label] = value
+            i += 1
+    return specs
+
+
+def spec_fields(specs):
+    """Map a label -> value spec map onto Product spec fields"""
+    fields = {}
+    for label, value in specs.items():
+        field = LABEL_TO_FIELD.get(label)
+        if field and field not in fields:
+            fields[field] = value
+    return fields
@@ -50,17 +50,36 @@ function initializeSearch() {
 }
 
 function fetchSearchSuggestions(query) {
-    fetch(`/api/search?q=${encodeURIComponent(query)}&limit=5`)
-        .then(response => response.json())
+    // /api/suggest answers from an in-memory prefix index; apps without it
+    // fall back to the full search API
+    fetch(`/api/suggest?q=${encodeURIComponent(query)}&limit=5`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
         .then(data => {
-            showSuggestions(data.products);
+            showSuggestions(data.suggestions.map(suggestion => ({
+                name: suggestion.name,
+                thumbnail: suggestion.thumbnail,
+                url: `/product/${suggestion.id}`
+            })));
         })
-        .catch(error => {
-            console.error('Error fetching suggestions:', error);
+        .catch(() => {
+            fetch(`/api/search?q=${encodeURIComponent(query)}&limit=5`)
+                .then(response => response.json())
+                .then(data => {
+                    showSuggestions(data.products.map(product => ({
+                        name: product.name,
+                        category: product.category
+                    })));
+                })
+                .catch(error => {
+                    console.error('Error fetching suggestions:', error);
+                });
         });
 }
 
-function showSuggestions(products) {
+function showSuggestions(suggestions) {
     const searchContainer = document.querySelector('.search-container');
     if (!searchContainer) return;
     
@@ -71,18 +90,34 @@ function showSuggestions(products) {
         searchContainer.appendChild(suggestionsDiv);
     }
     
-    if (products.length === 0) {
+    if (suggestions.length === 0) {
         hideSuggestions();
         return;
     }
     
-    suggestionsDiv.innerHTML = products.map(product => `
-        <div class="search-suggestion" onclick="selectSuggestion('${product.name}')">
-            <strong>${product.name}</strong>
-            <br>
-            <small class="text-muted">${product.category}</small>
-        </div>
-    `).join('');
+    // Built as elements so product names are never parsed as HTML
+    suggestionsDiv.replaceChildren(...suggestions.map(suggestion => {
+        const item = document.createElement('div');
+        item.className = 'search-suggestion';
+        if (suggestion.thumbnail) {
+            const img = document.createElement('img');
+            img.src = suggestion.thumbnail;
+            img.alt = '';
+            img.className = 'search-suggestion-thumbnail';
+            item.appendChild(img);
+        }
+        const name = document.createElement('strong');
+        name.textContent = suggestion.name;
+        item.appendChild(name);
+        if (suggestion.category) {
+            const category = document.createElement('small');
+            category.className = 'text-muted d-block';
+            category.textContent = suggestion.category;
+            item.appendChild(category);
+        }
+        item.addEventListener('click', () => selectSuggestion(suggestion));
+        return item;
+    }));
     
     suggestionsDiv.style.display = 'block';
 }
@@ -94,13 +129,17 @@ function hideSuggestions() {
     }
 }
 
-function selectSuggestion(productName) {
+function selectSuggestion(suggestion) {
+    hideSuggestions();
+    if (suggestion.url) {
+        window.location.href = suggestion.url;
+        return;
+    }
     const searchInput = document.querySelector('input[name="search"]');
     if (searchInput) {
-        searchInput.value = productName;
+        searchInput.value = suggestion.name;
         searchInput.form.submit();
     }
-    hideSuggestions();
 }
 
 function initializeProductCards() {
@@ -0,0 +1,195 @@
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+from models import Product, db
+
+logger = logging.getLogger(__name__)
+
+# Match ranks, best first: the start of the name, a later word of the name, a material code, a category
+NAME_START, NAME_WORD, CODE, CATEGORY = range(4)
+
+# Above this many changed products a refresh re-sorts everything instead of inserting
+REBUILD_THRESHOLD = 2000
+
+
+@lru_cache(maxsize=4096)
+def fold(value):
+    """Lowercase, accent-free, single-spaced form used for keys and queries"""
+    value = value or ''
+    if not value.isascii():
+        value = unicodedata.normalize('NFKD', value)
+        value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.lower().split())
+
+
+def product_keys(name, material_code, category):
+    """(rank, key) pairs indexed for one product
+
+    Names are indexed from the start of every word, so "blan" finds
+    "Cubierta Sólida Blanca".
+    """
+    words = fold(name).split(' ')
+    keys = [(NAME_START if i == 0 else NAME_WORD, ' '.join(words[i:])) for i in range(len(words)) if words[i]]
+    for rank, value in ((CODE, fold(material_code)), (CATEGORY, fold(category))):
+        if value:
+            keys.append((rank, value))
+    return keys
+
+
+class SuggestIndex:
+    """In-process prefix index over product names, material codes and categories
+
+    Each match rank has one sorted list of (key, product id); a lookup
+    bisects to the first key with the prefix in the best rank's list and
+    walks the matching range, moving to the next rank only while fewer
+    than ``limit`` products were found, without touching the database.
+    ``refresh()`` applies the products changed since the last sync (by
+    updated_at) and drops deleted ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = [[] for _ in range(CATEGORY + 1)]
+        self._keys = {}       # product id -> its (rank, key) pairs
+        self._products = {}   # product id -> (name, image path under static/, external image URL)
+        self.built = False
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self._products)
+
+    def _rows(self, since=None):
+        query = db.session.query(
+            Product.id, Product.name, Product.material_code, Product.category,
+            Product.thumbnail_path, Product.local_image_path, Product.image_url, Product.updated_at
+        )
+        if since is not None:
+            query = query.filter(Product.updated_at >= since)
+        return query.all()
+
+    def build(self):
+        """Load every product (inside an app context)"""
+        rows = self._rows()
+        entries = [[] for _ in range(CATEGORY + 1)]
+        keys = {}
+        for row in rows:
+            keys[row.id] = product_keys(row.name, row.material_code, row.category)
+            for rank, key in keys[row.id]:
+                entries[rank].append((key, row.id))
+        for ranked in entries:
+            ranked.sort()
+        products = {row.id: (row.name, row.thumbnail_path or row.local_image_path, row.image_url) for row in rows}
+        with self._lock:
+            self._entries, self._keys, self._products = entries, keys, products
+            self.built = True
+            self.synced_at = max((row.updated_at for row in rows if row.updated_at), default=None)
+        logger.info(f"Built suggestion index: {len(products)} products, {sum(map(len, entries))} keys")
+
+    def _remove(self, product_id):
+        for rank, key in self._keys.pop(product_id, []):
+            ranked = self._entries[rank]
+            i = bisect_left(ranked, (key, product_id))
+            if i < len(ranked) and ranked[i] == (key, product_id):
+                del ranked[i]
+        self._products.pop(product_id, None)
+
+    def refresh(self):
+        """Apply products changed since the last sync; returns how many changed"""
+        if not self.built:
+            self.build()
+            return len(self)
+        rows = self._rows(since=self.synced_at)
+        if len(rows) > REBUILD_THRESHOLD:
+            self.build()
+            return len(rows)
+
+        with self._lock:
+            for row in rows:
+                self._remove(row.id)
+                self._keys[row.id] = product_keys(row.name, row.material_code, row.category)
+                for rank, key in self._keys[row.id]:
+                    insort(self._entries[rank], (key, row.id))
+                self._products[row.id] = (row.name, row.thumbnail_path or row.local_image_path, row.image_url)
+                if row.updated_at and (self.synced_at is None or row.updated_at > self.synced_at):
+                    self.synced_at = row.updated_at
+            indexed = len(self._products)
+
+        # Every live product is indexed now, so a larger index means deletions
+        deleted = []
+        if indexed > db.session.query(db.func.count(Product.id)).scalar():
+            live_ids = {product_id for product_id, in db.session.query(Product.id)}
+            with self._lock:
+                deleted = [product_id for product_id in self._products if product_id not in live_ids]
+                for product_id in deleted:
+                    self._remove(product_id)
+        return len(rows) + len(deleted)
+
+    def suggest(self, prefix, limit=5):
+        """Up to ``limit`` (id, name, image path, image URL) for products matching ``prefix``
+
+        Name starts rank first, then later name words, material codes and
+        categories; alphabetical within a rank.
+        """
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        found = []
+        with self._lock:
+            for ranked in self._entries:
+                i = bisect_left(ranked, (prefix,))
+                while i < len(ranked) and len(found) < limit:
+                    key, product_id = ranked[i]
+                    if not key.startswith(prefix):
+                        break
+                    if product_id not in found:
+                        found.append(product_id)
+                    i += 1
+                if len(found) >= limit:
+                    break
+            return [(product_id,) + self._products[product_id] for product_id in found]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """The process-wide index for the current database, built on first use
+
+    The first build runs under the module lock, so concurrent first
+    requests wait for one build instead of each doing their own.
+    """
+    url = str(db.engine.url)
+    index = _indexes.get(url)
+    if index is not None and index.built:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(url)
+        if index is None:
+            index = _indexes[url] = SuggestIndex()
+        if not index.built:
+            index.build()
+    return index
+
+
+def refresh_suggest_index():
+    """Apply committed product changes to the current database's index, if it was built
+
+    Called by the scrapers after a run commits and by the routes that delete
+    products. Errors are logged: a stale
+    suggestion list must not fail the run.
+    """
+    index = _indexes.get(str(db.engine.url))
+    if index is None:
+        return 0
+    try:
+        with _indexes_lock:
+            changed = index.refresh()
+        logger.info(f"Suggestion index refreshed: {changed} products changed")
+        return changed
+    except Exception as e:
+        logger.error(f"Error refreshing suggestion index: {e}")
+        db.session.rollback()
+        return 0
@@ -0,0 +1,60 @@
+from crawl_frontier import CrawlFrontier
+
+
+def _crawl(frontier, urls, fail=()):
+    """Queue ``urls``, then mark every popped URL not in ``fail`` as done"""
+    for url in urls:
+        frontier.add({'url': url})
+    visited = []
+    for item in frontier:
+        visited.append(item['url'])
+        if item['url'] not in fail:
+            frontier.mark_done(item['url'])
+    frontier.commit()
+    return visited
+
+
+def test_completed_run_revisits_known_urls(tmp_path):
+    path = str(tmp_path / 'frontier.db')
+    urls = ['https://example.com/p/1', 'https://example.com/p/2']
+
+    first = CrawlFrontier(path)
+    assert _crawl(first, urls) == urls
+    first.reset()
+    first.close()
+
+    second = CrawlFrontier(path)
+    assert _crawl(second, urls) == urls
+    second.close()
+
+
+def test_interrupted_run_retries_failed_and_pending_urls(tmp_path):
+    path = str(tmp_path / 'frontier.db')
+    urls = ['https://example.com/p/1', 'https://example.com/p/2']
+
+    crashed = CrawlFrontier(path)
+    crashed.add({'url': urls[0]})
+    crashed.add({'url': urls[1]})
+    crashed.mark_done(crashed.pop()['url'])
+    crashed.commit()
+    # urls[1] was still queued when the process died
+    crashed.close()
+
+    resumed = CrawlFrontier(path)
+    assert _crawl(resumed, urls, fail={urls[1]}) == [urls[1]]
+    resumed.close()
+
+    retried = CrawlFrontier(path)
+    assert _crawl(retried, urls) == [urls[1]]
+    retried.close()
+
+
+def test_uncommitted_urls_are_not_persisted(tmp_path):
+    path = str(tmp_path / 'frontier.db')
+
+    frontier = CrawlFrontier(path)
+    frontier.add({'url': 'https://example.com/p/1'})
+    frontier.mark_done(frontier.pop()['url'])
+    frontier.close()
+
+    assert 'https://example.com/p/1' not in CrawlFrontier(path)
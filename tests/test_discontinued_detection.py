@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('bs4')
+pytest.importorskip('lxml')
+
+from product_extract import extract_product
+
+PAGE = '''
+<html><body>
+  <nav class="menu"><a href="/">Inicio</a></nav>
+  {marker}
+  <div class="product-info">
+    <h1 class="product-title">Laminado X</h1>
+    <div class="product-image"><img src="/media/laminado-x.jpg"></div>
+  </div>
+</body></html>
+'''
+
+
+@pytest.mark.parametrize('marker', [
+    '<div class="alert">Este producto ha sido descontinuado</div>',
+    '<section><span>Discontinued</span></section>',
+])
+def test_marker_outside_product_blocks_is_detected(marker):
+    result = extract_product(PAGE.format(marker=marker), 'https://example.com/p/x')
+    assert result['product']['discontinued']
+    assert result['product']['name'] == 'Laminado X'
+
+
+def test_page_without_markers_is_not_discontinued():
+    result = extract_product(PAGE.format(marker=''), 'https://example.com/p/x')
+    assert not result['product']['discontinued']
+    assert not result['details']['evidence']
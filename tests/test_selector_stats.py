@@ -0,0 +1,43 @@
+import pytest
+
+from selector_stats import AdaptiveSelectors
+
+NAME_SELECTORS = ['h1.product-title', 'h1.page-title', '.product-name h1', 'h1', '.product-details h1']
+PROMO_PAGE = '''
+<html><body>
+  <div class="promo"><h1>Oferta de verano</h1></div>
+  <div class="product-info"><h1 class="product-title">Laminado X</h1></div>
+</body></html>
+'''
+
+
+def _selectors(tmp_path, fixed=None):
+    return AdaptiveSelectors({'name': NAME_SELECTORS}, stats_path=str(tmp_path / 'stats.json'),
+                             fixed=fixed if fixed is not None else {'name': ['h1']})
+
+
+def test_fallback_keeps_its_position(tmp_path):
+    selectors = _selectors(tmp_path)
+    for _ in range(3):
+        selectors.record('name', 'h1', 4)
+    assert selectors.ordered('name') == NAME_SELECTORS
+
+
+def test_specific_selectors_reorder_between_fallbacks(tmp_path):
+    selectors = _selectors(tmp_path)
+    for _ in range(3):
+        selectors.record('name', '.product-name h1', 3)
+        selectors.record('name', '.product-details h1', 5)
+    assert selectors.ordered('name') == [
+        '.product-name h1', 'h1.product-title', 'h1.page-title', 'h1', '.product-details h1'
+    ]
+
+
+def test_page_where_fallback_and_specific_selector_both_match(tmp_path):
+    pytest.importorskip('bs4')
+    from html_parse import parse_html
+
+    selectors = _selectors(tmp_path)
+    for _ in range(3):
+        selectors.record('name', 'h1', 4)
+    assert selectors.select(parse_html(PROMO_PAGE), 'name').get_text(strip=True) == 'Laminado X'
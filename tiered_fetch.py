@@ -0,0 +1,206 @@
+import re
+import time
+import threading
+import logging
+from collections import defaultdict, deque, namedtuple
+from urllib.parse import urlparse
+from content_fingerprint import page_fingerprint
+from html_parse import parse_html
+from scrape_engine import percentile
+
+logger = logging.getLogger(__name__)
+
+# tier is 'http', 'browser', 'not_modified', 'unchanged' or None (failed);
+# fingerprint is taken from the plain HTTP response whenever there was one
+FetchResult = namedtuple('FetchResult', ['soup', 'tier', 'fingerprint'])
+
+
+def url_pattern(url):
+    """Collapse a URL into a pattern shared by pages with the same layout
+
+    ``https://host/productos/laminados/7927-60`` -> ``host/productos/laminados/*``
+    Numeric segments are replaced everywhere, and the final segment (the
+    product slug) is always a wildcard.
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split('/') if s]
+    segments = [re.sub(r'\d+', '#', s) for s in segments[:-1]]
+    return '/'.join([parsed.netloc.lower()] + segments + ['*'])
+
+
+class TieredFetcher:
+    """Fetch pages with plain HTTP first and escalate to a browser on demand
+
+    Each URL pattern remembers how often the HTTP tier produced a complete
+    page. Once a pattern has ``min_samples`` observations and HTTP almost
+    never works for it, its URLs go straight to the browser tier. Such
+    patterns are re-probed with HTTP every ``reprobe_every`` pages in case
+    the site changes. Pages are parsed with ``parser`` (markup -> soup),
+    and the time spent parsing is reported per page; the last
+    ``parse_samples`` parse times are kept for percentiles.
+    """
+
+    TIERS = ('http', 'browser')
+
+    def __init__(self, session, render_fn, is_complete, politeness=None, resilience=None,
+                 timeout=15, min_samples=5, min_http_success=0.2, reprobe_every=50, parser=parse_html,
+                 parse_samples=10000):
+        self.session = session
+        self.render_fn = render_fn
+        self.is_complete = is_complete
+        self.politeness = politeness
+        self.resilience = resilience
+        self.timeout = timeout
+        self.min_samples = min_samples
+        self.min_http_success = min_http_success
+        self.reprobe_every = reprobe_every
+        self.parser = parser
+
+        self._lock = threading.Lock()
+        self._patterns = defaultdict(lambda: {'http_ok': 0, 'http_failed': 0, 'skipped': 0})
+        self.stats = {'http': 0, 'browser': 0, 'escalated': 0, 'failed': 0,
+                      'not_modified': 0, 'unchanged': 0, 'parsed': 0, 'parse_seconds': 0.0}
+        self.parse_durations = deque(maxlen=parse_samples)
+
+    def fetch(self, url, skip_unchanged=False, known_fingerprint=None):
+        """Fetch ``url`` and return a FetchResult
+
+        With ``skip_unchanged`` an HTTP response flagged ``not_modified`` by a
+        caching session is not parsed (tier 'not_modified'). With
+        ``known_fingerprint`` the page is always fetched over plain HTTP first
+        and is not parsed when its normalized content hash still matches
+        (tier 'unchanged'), even for patterns that normally need the browser.
+        """
+        markup, tier, fingerprint = self.fetch_markup(url, skip_unchanged, known_fingerprint)
+        if tier == 'http':
+            soup = self._timed_parse(markup)
+            complete = soup is not None and self.is_complete(soup)
+            self.verified(url, complete)
+            if complete:
+                return FetchResult(soup, 'http', fingerprint)
+            markup, tier, fingerprint = self.render(url, fingerprint)
+
+        if tier == 'browser':
+            return FetchResult(self._timed_parse(markup), 'browser', fingerprint)
+        return FetchResult(None, tier, fingerprint)
+
+    def fetch_markup(self, url, skip_unchanged=False, known_fingerprint=None):
+        """Like ``fetch()`` but return the unparsed markup as the result's soup
+
+        Pages from the HTTP tier (tier 'http') are not checked for
+        completeness here: the caller parses them, reports the outcome with
+        ``verified()`` and calls ``render()`` for incomplete ones. This lets
+        parsing run elsewhere, e.g. in a process pool.
+        """
+        pattern = url_pattern(url)
+        fingerprint = None
+        incremental = known_fingerprint is not None
+
+        if skip_unchanged or incremental or self._should_try_http(pattern):
+            response = self._get(url)
+            if skip_unchanged and getattr(response, 'not_modified', False):
+                self._count('not_modified')
+                return FetchResult(None, 'not_modified', None)
+
+            if response is not None and response.status_code == 200:
+                fingerprint = page_fingerprint(response.content)
+                if incremental and fingerprint == known_fingerprint:
+                    self._count('unchanged')
+                    return FetchResult(None, 'unchanged', fingerprint)
+
+            if not incremental or self._should_try_http(pattern):
+                if self._is_html(response):
+                    return FetchResult(response.content, 'http', fingerprint)
+                self.verified(url, False)
+
+        return self.render(url, fingerprint)
+
+    def verified(self, url, complete):
+        """Record whether an HTTP-tier page had everything the scraper needs"""
+        self._record(url_pattern(url), complete)
+        self._count('http' if complete else 'escalated')
+
+    def render(self, url, fingerprint=None):
+        """Fetch ``url`` with the browser tier; returns a FetchResult with the markup"""
+        html = self.render_fn(url)
+        if html is None:
+            self._count('failed')
+            return FetchResult(None, None, fingerprint)
+
+        self._count('browser')
+        return FetchResult(html, 'browser', fingerprint)
+
+    def record_parse(self, seconds):
+        """Add one page parsed elsewhere to the parse-time stats"""
+        with self._lock:
+            self.stats['parsed'] += 1
+            self.stats['parse_seconds'] += seconds
+            self.parse_durations.append(seconds)
+
+    def report(self):
+        """Per-tier hit rates for this run plus the learned pattern table"""
+        with self._lock:
+            served = self.stats['http'] + self.stats['browser']
+            parsed = self.stats['parsed']
+            durations = list(self.parse_durations)
+            return {
+                'pages': served,
+                'http': self.stats['http'],
+                'browser': self.stats['browser'],
+                'escalated': self.stats['escalated'],
+                'failed': self.stats['failed'],
+                'not_modified': self.stats['not_modified'],
+                'unchanged': self.stats['unchanged'],
+                'http_hit_rate': round(self.stats['http'] / served, 3) if served else 0.0,
+                'browser_hit_rate': round(self.stats['browser'] / served, 3) if served else 0.0,
+                'parsed': parsed,
+                'parse_ms_per_page': round(self.stats['parse_seconds'] * 1000 / parsed, 2) if parsed else 0.0,
+                'parse_p50_ms': round(percentile(durations, 0.5) * 1000, 1) if durations else None,
+                'parse_p95_ms': round(percentile(durations, 0.95) * 1000, 1) if durations else None,
+                'patterns': {p: dict(s) for p, s in self._patterns.items()},
+            }
+
+    def _should_try_http(self, pattern):
+        with self._lock:
+            stats = self._patterns[pattern]
+            samples = stats['http_ok'] + stats['http_failed']
+            if samples < self.min_samples:
+                return True
+            if stats['http_ok'] / samples >= self.min_http_success:
+                return True
+
+            stats['skipped'] += 1
+            return stats['skipped'] % self.reprobe_every == 0
+
+    def _get(self, url):
+        try:
+            if self.resilience:
+                return self.resilience.call('product', url, lambda timeout: self._get_once(url, timeout))
+            return self._get_once(url, self.timeout)
+        except Exception as e:
+            logger.warning(f"HTTP tier failed for {url}: {e}")
+            return None
+
+    def _get_once(self, url, timeout):
+        if self.politeness:
+            self.politeness.wait(url)
+        return self.session.get(url, timeout=timeout)
+
+    def _is_html(self, response):
+        if response is None or response.status_code != 200:
+            return False
+        return 'html' in response.headers.get('Content-Type', 'text/html')
+
+    def _timed_parse(self, markup):
+        started = time.perf_counter()
+        soup = self.parser(markup)
+        self.record_parse(time.perf_counter() - started)
+        return soup
+
+    def _record(self, pattern, complete):
+        with self._lock:
+            self._patterns[pattern]['http_ok' if complete else 'http_failed'] += 1
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1